@@ -1,21 +1,51 @@
 #!/usr/bin/env python3
 from aws_cdk import App, Environment
-from infra.stacks.base_stack import BaseStack
-from infra.stacks.analytics_stack import AnalyticsStack
 
-app = App()
-env = Environment(account="702630738474", region="us-east-1")
 
-base = BaseStack(app, "MortgagePipelineBaseStack", env=env)
+def _context_flag(app: App, key: str, default: bool) -> bool:
+    # -c values arrive as strings, cdk.json values as JSON booleans
+    value = app.node.try_get_context(key)
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
 
-analytics = AnalyticsStack(
-    app, "MortgageAnalyticsStack",
-    env=env,
-    vpc=base.vpc,
-    bucket=base.bucket,
-    data_key=base.data_key,
-)
 
-analytics.add_dependency(base)
+def main() -> None:
+    # Stack modules pull in the construct libraries they use; import them only
+    # when the app is actually being synthesized.
+    from infra.stacks.base_stack import BaseStack
 
-app.synth()
+    app = App()
+    env = Environment(account="702630738474", region="us-east-1")
+
+    base = BaseStack(
+        app, "MortgagePipelineBaseStack",
+        env=env,
+        raw_to_hot_bucket=_context_flag(app, "raw_to_hot_bucket", default=False),
+        logs_to_s3=_context_flag(app, "logs_to_s3", default=False),
+    )
+
+    # `cdk synth -c include_analytics=false` synthesizes BaseStack only
+    if _context_flag(app, "include_analytics", default=True):
+        from infra.stacks.analytics_stack import AnalyticsStack
+
+        analytics = AnalyticsStack(
+            app, "MortgageAnalyticsStack",
+            env=env,
+            vpc=base.vpc,
+            bucket=base.bucket,
+            data_key=base.data_key,
+            hot_bucket=base.hot_bucket,
+            raw_on_hot_bucket=base.raw_on_hot_bucket,
+            inference_mode=app.node.try_get_context("inference_mode") or "batch",
+        )
+
+        analytics.add_dependency(base)
+
+    app.synth()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,32 @@
 # analytics_stack.py
 from __future__ import annotations
 
+import os
+
 from aws_cdk import (
     Stack,
     Duration,
     CfnOutput,
     aws_ec2 as ec2,
     aws_s3 as s3,
+    aws_s3express as s3express,
     aws_kms as kms,
     aws_iam as iam,
-    aws_ecr as ecr,
-    aws_sagemaker as sagemaker,
+    aws_ecr_assets as ecr_assets,
     aws_stepfunctions as sfn,
-    aws_stepfunctions_tasks as tasks,
 )
 from constructs import Construct
 
+ML_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "ml")
+
 
 class AnalyticsStack(Stack):
     """
     Analytics/ML stack (isolated from BaseStack):
-      - SageMaker Processing (ECR image)
-      - SageMaker Model (ECR image) for Batch Transform
+      - SageMaker Processing (CDK-built image asset)
+      - SageMaker Model (CDK-built image asset) for Batch Transform
       - Step Functions StateMachine: Processing -> Transform
+        (or Processing -> async endpoint invocation with inference_mode="async")
       - (No schedules here; run manually first, add EventBridge later if needed)
     """
 
@@ -34,20 +38,53 @@ class AnalyticsStack(Stack):
         vpc: ec2.IVpc,
         bucket: s3.IBucket,
         data_key: kms.IKey,
+        hot_bucket: s3express.CfnDirectoryBucket | None = None,
+        raw_on_hot_bucket: bool = False,
         processing_repo_name: str = "mortgage-processing",
         inference_repo_name: str = "mortgage-inference",
+        inference_mode: str = "batch",
         **kwargs,
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        if raw_on_hot_bucket and hot_bucket is None:
+            raise ValueError("raw_on_hot_bucket requires hot_bucket")
+        if inference_mode not in ("batch", "async"):
+            raise ValueError(f"inference_mode must be 'batch' or 'async', got {inference_mode!r}")
+
+        # SageMaker bindings are only needed by this stack; load them here so
+        # synthesizing BaseStack alone does not pay for them.
+        import aws_cdk.aws_sagemaker as sagemaker
+
         # -----------------------------
-        # ECR repos
+        # Container images (built and published by CDK)
+        # The named ECR repos only hold the BuildKit layer cache, so an
+        # unchanged Dockerfile/source is neither rebuilt nor re-pushed.
         # -----------------------------
-        processing_repo = ecr.Repository.from_repository_name(
-            self, "ProcessingRepo", repository_name=processing_repo_name
+        def registry_cache(repo_name: str) -> ecr_assets.DockerCacheOption:
+            return ecr_assets.DockerCacheOption(
+                type="registry",
+                params={
+                    "ref": f"{self.account}.dkr.ecr.{self.region}.amazonaws.com/{repo_name}:buildcache",
+                    "mode": "max",
+                },
+            )
+
+        processing_image = ecr_assets.DockerImageAsset(
+            self,
+            "ProcessingImage",
+            directory=os.path.join(ML_DIR, "processing"),
+            platform=ecr_assets.Platform.LINUX_AMD64,
+            cache_from=[registry_cache(processing_repo_name)],
+            cache_to=registry_cache(processing_repo_name),
         )
-        inference_repo = ecr.Repository.from_repository_name(
-            self, "InferenceRepo", repository_name=inference_repo_name
+        inference_image = ecr_assets.DockerImageAsset(
+            self,
+            "InferenceImage",
+            directory=os.path.join(ML_DIR, "inference"),
+            platform=ecr_assets.Platform.LINUX_AMD64,
+            cache_from=[registry_cache(inference_repo_name)],
+            cache_to=registry_cache(inference_repo_name),
         )
 
         # -----------------------------
@@ -61,9 +98,13 @@ class AnalyticsStack(Stack):
             description="Security group for SageMaker Processing/Transform in VPC",
         )
 
-        sm_subnets = vpc.select_subnets(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS).subnets
-        sm_subnet_ids = [s.subnet_id for s in sm_subnets]
-        sm_sg_ids = [sm_sg.security_group_id]
+        # Resolve the selection once; SelectedSubnets already carries the ids,
+        # so there is no per-subnet property lookup. The ids are kept as
+        # tuples and each CFN property below gets its own list() copy.
+        self._private_subnet_ids = tuple(
+            vpc.select_subnets(subnet_type=ec2.SubnetType.PRIVATE_ISOLATED).subnet_ids
+        )
+        self._sm_sg_ids = (sm_sg.security_group_id,)
 
         # -----------------------------
         # SageMaker execution role (Processing + Transform)
@@ -82,6 +123,18 @@ class AnalyticsStack(Stack):
         bucket.grant_read_write(sm_role)
         data_key.grant_encrypt_decrypt(sm_role)
 
+        # curated/predictions live on the directory bucket when BaseStack has
+        # one; raw too when the worker writes there (raw_on_hot_bucket)
+        hot_bucket_name = bucket.bucket_name
+        if hot_bucket is not None:
+            hot_bucket_name = hot_bucket.ref
+            sm_role.add_to_policy(
+                iam.PolicyStatement(
+                    actions=["s3express:CreateSession"],
+                    resources=[hot_bucket.attr_arn],
+                )
+            )
+
         # -----------------------------
         # SageMaker Model (for Batch Transform)
         # -----------------------------
@@ -90,12 +143,12 @@ class AnalyticsStack(Stack):
             "MortgageBatchModel",
             execution_role_arn=sm_role.role_arn,
             primary_container=sagemaker.CfnModel.ContainerDefinitionProperty(
-                image=inference_repo.repository_uri_for_tag("latest"),
+                image=inference_image.image_uri,
                 environment={"OUTPUT_FORMAT": "jsonl"},
             ),
             vpc_config=sagemaker.CfnModel.VpcConfigProperty(
-                security_group_ids=sm_sg_ids,
-                subnets=sm_subnet_ids,
+                security_group_ids=list(self._sm_sg_ids),
+                subnets=list(self._private_subnet_ids),
             ),
         )
         sm_role.add_managed_policy(
@@ -107,240 +160,273 @@ class AnalyticsStack(Stack):
         # -----------------------------
         # Step Functions role (must PassRole to SageMaker)
         # -----------------------------
+        # One inline document on the role itself, so CloudFormation has no
+        # separate AWS::IAM::Policy resource to create and stabilize.
+        sf_policy = iam.PolicyDocument(
+            statements=[
+                iam.PolicyStatement(
+                    actions=[
+                        "sagemaker:CreateProcessingJob",
+                        "sagemaker:DescribeProcessingJob",
+                        "sagemaker:StopProcessingJob",
+                        "sagemaker:CreateTransformJob",
+                        "sagemaker:DescribeTransformJob",
+                        "sagemaker:StopTransformJob",
+                        "sagemaker:AddTags",
+                        "sagemaker:ListTags",
+                    ],
+                    # job names are States.Format('mortgage-proc-{}' / 'mortgage-xform-{}', $.dt)
+                    resources=[
+                        f"arn:{self.partition}:sagemaker:{self.region}:{self.account}:processing-job/mortgage-proc-*",
+                        f"arn:{self.partition}:sagemaker:{self.region}:{self.account}:transform-job/mortgage-xform-*",
+                    ],
+                ),
+                iam.PolicyStatement(
+                    actions=["iam:PassRole"],
+                    resources=[sm_role.role_arn],
+                ),
+                # .sync integrations complete via these managed EventBridge rules
+                iam.PolicyStatement(
+                    actions=["events:PutTargets", "events:PutRule", "events:DescribeRule"],
+                    resources=[
+                        f"arn:{self.partition}:events:{self.region}:{self.account}:rule/"
+                        "StepFunctionsGetEventsForSageMakerProcessingJobsRule",
+                        f"arn:{self.partition}:events:{self.region}:{self.account}:rule/"
+                        "StepFunctionsGetEventsForSageMakerTransformJobsRule",
+                    ],
+                ),
+            ]
+        )
         sf_role = iam.Role(
             self,
             "MlPipelineStateMachineRole",
             assumed_by=iam.ServicePrincipal("states.amazonaws.com"),
             description="Role for Step Functions to orchestrate SageMaker jobs",
-        )
-
-        sf_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=[
-                    "sagemaker:CreateProcessingJob",
-                    "sagemaker:DescribeProcessingJob",
-                    "sagemaker:StopProcessingJob",
-                    "sagemaker:CreateTransformJob",
-                    "sagemaker:DescribeTransformJob",
-                    "sagemaker:StopTransformJob",
-                ],
-                resources=["*"],
-            )
-        )
-        sf_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=["iam:PassRole"],
-                resources=[sm_role.role_arn],
-            )
+            inline_policies={"SfOrchestration": sf_policy},
         )
 
         # -----------------------------
         # Step Functions definition
         # Input example: {"dt":"2026-01-18"}
+        #
+        # The job states are CustomState (there is no L2 task for Processing),
+        # which passes its JSON through as-is, so the "*.$" keys and
+        # States.Format expressions are written out there.
         # -----------------------------
-        processing_job_name = sfn.JsonPath.format(
-            "mortgage-proc-{}", sfn.JsonPath.string_at("$.dt")
-        )
-        transform_job_name = sfn.JsonPath.format(
-            "mortgage-xform-{}", sfn.JsonPath.string_at("$.dt")
-        )
+        processing_job_name = "States.Format('mortgage-proc-{}', $.dt)"
+        transform_job_name = "States.Format('mortgage-xform-{}', $.dt)"
 
-        raw_s3_prefix = sfn.JsonPath.format(
-            f"s3://{bucket.bucket_name}/raw/payments/dt={{}}/",
-            sfn.JsonPath.string_at("$.dt"),
+        # Build the run's S3 URIs once at machine start; the job states read
+        # them from $.uris instead of each carrying its own States.Format.
+        dt = sfn.JsonPath.string_at("$.dt")
+        raw_bucket_name = hot_bucket_name if raw_on_hot_bucket else bucket.bucket_name
+        run_uris = {
+            "rawUri": sfn.JsonPath.format(
+                f"s3://{raw_bucket_name}/raw/payments/dt={{}}/", dt
+            ),
+            "curatedUri": sfn.JsonPath.format(
+                f"s3://{hot_bucket_name}/curated/payments/dt={{}}/", dt
+            ),
+            "predUri": sfn.JsonPath.format(
+                f"s3://{hot_bucket_name}/predictions/payments/dt={{}}/", dt
+            ),
+        }
+        if inference_mode == "async":
+            # async endpoints take a single object: the file process.py writes
+            run_uris["curatedObjectUri"] = sfn.JsonPath.format(
+                f"s3://{hot_bucket_name}/curated/payments/dt={{}}/data.jsonl", dt
+            )
+        resolve_uris = sfn.Pass(
+            self,
+            "ResolveRunUris",
+            parameters=run_uris,
+            result_path="$.uris",
         )
-        curated_s3_prefix = sfn.JsonPath.format(
-            f"s3://{bucket.bucket_name}/curated/payments/dt={{}}/",
-            sfn.JsonPath.string_at("$.dt"),
+
+        processing_failed = sfn.Fail(
+            self, "ProcessingFailed", cause="SageMaker Processing failed/stopped"
         )
-        pred_s3_prefix = sfn.JsonPath.format(
-            f"s3://{bucket.bucket_name}/predictions/payments/dt={{}}/",
-            sfn.JsonPath.string_at("$.dt"),
+        transform_failed = sfn.Fail(
+            self, "TransformFailed", cause="SageMaker Transform failed/stopped"
         )
+        pipeline_succeeded = sfn.Succeed(self, "PipelineSucceeded")
 
         # -----------------------------
-        # Processing: create + describe + wait loop
+        # Processing: createProcessingJob.sync
+        # Step Functions waits for the job's completion event; no polling.
         # -----------------------------
-        start_processing = tasks.CallAwsService(
+        start_processing = sfn.CustomState(
             self,
             "StartProcessingJob",
-            service="sagemaker",
-            action="createProcessingJob",
-            parameters={
-                "ProcessingJobName": processing_job_name,
-                "RoleArn": sm_role.role_arn,
-                "AppSpecification": {
-                    "ImageUri": processing_repo.repository_uri_for_tag("latest"),
-                },
-                "ProcessingResources": {
-                    "ClusterConfig": {
-                        "InstanceType": "ml.m5.large",
-                        "InstanceCount": 1,
-                        "VolumeSizeInGB": 30,
-                    }
-                },
-                "NetworkConfig": {
-                    "VpcConfig": {
-                        "SecurityGroupIds": sm_sg_ids,
-                        "Subnets": sm_subnet_ids,
-                    }
-                },
-                "ProcessingInputs": [
-                    {
-                        "InputName": "raw",
-                        "S3Input": {
-                            "S3Uri": raw_s3_prefix,
-                            "LocalPath": "/opt/ml/processing/input",
-                            "S3DataType": "S3Prefix",
-                            "S3InputMode": "File",
-                        },
-                    }
-                ],
-                "ProcessingOutputConfig": {
-                    "Outputs": [
+            state_json={
+                "Type": "Task",
+                "Resource": f"arn:{self.partition}:states:::sagemaker:createProcessingJob.sync",
+                "Parameters": {
+                    "ProcessingJobName.$": processing_job_name,
+                    "RoleArn": sm_role.role_arn,
+                    "AppSpecification": {
+                        "ImageUri": processing_image.image_uri,
+                    },
+                    "ProcessingResources": {
+                        "ClusterConfig": {
+                            "InstanceType": "ml.m5.large",
+                            "InstanceCount": 1,
+                            "VolumeSizeInGB": 30,
+                        }
+                    },
+                    "NetworkConfig": {
+                        "VpcConfig": {
+                            "SecurityGroupIds": list(self._sm_sg_ids),
+                            "Subnets": list(self._private_subnet_ids),
+                        }
+                    },
+                    "ProcessingInputs": [
                         {
-                            "OutputName": "curated",
-                            "S3Output": {
-                                "S3Uri": curated_s3_prefix,
-                                "LocalPath": "/opt/ml/processing/output",
-                                "S3UploadMode": "EndOfJob",
+                            "InputName": "raw",
+                            "S3Input": {
+                                "S3Uri.$": "$.uris.rawUri",
+                                "LocalPath": "/opt/ml/processing/input",
+                                "S3DataType": "S3Prefix",
+                                "S3InputMode": "File",
                             },
                         }
-                    ]
+                    ],
+                    "ProcessingOutputConfig": {
+                        "Outputs": [
+                            {
+                                "OutputName": "curated",
+                                "S3Output": {
+                                    "S3Uri.$": "$.uris.curatedUri",
+                                    "LocalPath": "/opt/ml/processing/output",
+                                    "S3UploadMode": "EndOfJob",
+                                },
+                            }
+                        ]
+                    },
+                    "Environment": {"OUTPUT_FORMAT": "jsonl"},
                 },
-                "Environment": {"OUTPUT_FORMAT": "jsonl"},
+                "ResultPath": "$.processingJob",
             },
-            iam_resources=["*"],
-            result_path="$.processingCreate",
         )
-
-        describe_processing = tasks.CallAwsService(
-            self,
-            "DescribeProcessingJob",
-            service="sagemaker",
-            action="describeProcessingJob",
-            parameters={"ProcessingJobName": processing_job_name},
-            iam_resources=["*"],
-            result_path="$.processingDesc",
+        start_processing.add_catch(
+            processing_failed, errors=["States.ALL"], result_path="$.error"
         )
 
-        wait_processing = sfn.Wait(
-            self,
-            "WaitProcessing30s",
-            time=sfn.WaitTime.duration(Duration.seconds(30)),
-        )
+        if inference_mode == "async":
+            # -----------------------------
+            # Async inference: a warm endpoint reads the curated object from S3
+            # and writes predictions under predictions/payments/async/. The
+            # state machine only enqueues the request; completion is published
+            # to the success/error topics.
+            # -----------------------------
+            import aws_cdk.aws_sns as sns
+            import aws_cdk.aws_stepfunctions_tasks as tasks
 
-        processing_done = sfn.Choice(self, "ProcessingDone?")
-        processing_failed = sfn.Fail(
-            self, "ProcessingFailed", cause="SageMaker Processing failed/stopped"
-        )
-
-        # IMPORTANT: only set next for describe_processing ONCE
-        describe_processing.next(processing_done)
+            async_success_topic = sns.Topic(self, "AsyncInferenceSuccess")
+            async_error_topic = sns.Topic(self, "AsyncInferenceError")
+            async_success_topic.grant_publish(sm_role)
+            async_error_topic.grant_publish(sm_role)
 
-        # Poll step: wait -> describe (describe already goes to processing_done)
-        processing_poll = wait_processing.next(describe_processing)
+            endpoint_config = sagemaker.CfnEndpointConfig(
+                self,
+                "MortgageAsyncEndpointConfig",
+                production_variants=[
+                    sagemaker.CfnEndpointConfig.ProductionVariantProperty(
+                        variant_name="AllTraffic",
+                        model_name=sm_model.attr_model_name,
+                        initial_instance_count=1,
+                        instance_type="ml.m5.large",
+                        initial_variant_weight=1.0,
+                    )
+                ],
+                async_inference_config=sagemaker.CfnEndpointConfig.AsyncInferenceConfigProperty(
+                    output_config=sagemaker.CfnEndpointConfig.AsyncInferenceOutputConfigProperty(
+                        s3_output_path=f"s3://{hot_bucket_name}/predictions/payments/async/",
+                        notification_config=sagemaker.CfnEndpointConfig.AsyncInferenceNotificationConfigProperty(
+                            success_topic=async_success_topic.topic_arn,
+                            error_topic=async_error_topic.topic_arn,
+                        ),
+                    ),
+                ),
+            )
+            endpoint = sagemaker.CfnEndpoint(
+                self,
+                "MortgageAsyncEndpoint",
+                endpoint_config_name=endpoint_config.attr_endpoint_config_name,
+            )
 
-        # -----------------------------
-        # Transform: create + describe + wait loop
-        # -----------------------------
-        start_transform = tasks.CallAwsService(
-            self,
-            "StartTransformJob",
-            service="sagemaker",
-            action="createTransformJob",
-            parameters={
-                "TransformJobName": transform_job_name,
-                "ModelName": sm_model.attr_model_name,
-                "TransformInput": {
-                    "DataSource": {
-                        "S3DataSource": {
-                            "S3DataType": "S3Prefix",
-                            "S3Uri": curated_s3_prefix,
-                        }
-                    },
+            inference_step = tasks.CallAwsService(
+                self,
+                "InvokeEndpointAsync",
+                service="sagemakerruntime",
+                action="invokeEndpointAsync",
+                parameters={
+                    "EndpointName": endpoint.attr_endpoint_name,
+                    "InputLocation": sfn.JsonPath.string_at("$.uris.curatedObjectUri"),
                     "ContentType": "application/jsonlines",
-                    "SplitType": "Line",
-                },
-                "TransformOutput": {
-                    "S3OutputPath": pred_s3_prefix,
-                    "AssembleWith": "Line",
                 },
-                "TransformResources": {
-                    "InstanceType": "ml.m5.large",
-                    "InstanceCount": 1,
-                },
-                "MaxConcurrentTransforms": 2,
-                "MaxPayloadInMB": 6,
-            },
-            iam_resources=["*"],
-            result_path="$.transformCreate",
-        )
-        # Ensure model exists before state machine runs jobs
-        start_transform.node.add_dependency(sm_model)
-
-        describe_transform = tasks.CallAwsService(
-            self,
-            "DescribeTransformJob",
-            service="sagemaker",
-            action="describeTransformJob",
-            parameters={"TransformJobName": transform_job_name},
-            iam_resources=["*"],
-            result_path="$.transformDesc",
-        )
-
-        wait_transform = sfn.Wait(
-            self,
-            "WaitTransform30s",
-            time=sfn.WaitTime.duration(Duration.seconds(30)),
-        )
-
-        transform_done = sfn.Choice(self, "TransformDone?")
-        transform_failed = sfn.Fail(
-            self, "TransformFailed", cause="SageMaker Transform failed/stopped"
-        )
-        pipeline_succeeded = sfn.Succeed(self, "PipelineSucceeded")
-
-        # IMPORTANT: only set next for describe_transform ONCE
-        describe_transform.next(transform_done)
-
-        # Poll step: wait -> describe (describe already goes to transform_done)
-        transform_poll = wait_transform.next(describe_transform)
-
-        # -----------------------------
-        # Wiring: loop until Completed / Failed / Stopped
-        # -----------------------------
-        processing_done.when(
-            sfn.Condition.string_equals("$.processingDesc.ProcessingJobStatus", "Completed"),
-            # Start transform, then describe (describe already goes to transform_done)
-            start_transform.next(describe_transform),
-        )
-        processing_done.when(
-            sfn.Condition.or_(
-                sfn.Condition.string_equals("$.processingDesc.ProcessingJobStatus", "Failed"),
-                sfn.Condition.string_equals("$.processingDesc.ProcessingJobStatus", "Stopped"),
-            ),
-            processing_failed,
-        )
-        processing_done.otherwise(processing_poll)
+                iam_action="sagemaker:InvokeEndpointAsync",
+                iam_resources=[endpoint.ref],
+                result_path="$.asyncInvoke",
+            )
 
-        transform_done.when(
-            sfn.Condition.string_equals("$.transformDesc.TransformJobStatus", "Completed"),
-            pipeline_succeeded,
-        )
-        transform_done.when(
-            sfn.Condition.or_(
-                sfn.Condition.string_equals("$.transformDesc.TransformJobStatus", "Failed"),
-                sfn.Condition.string_equals("$.transformDesc.TransformJobStatus", "Stopped"),
-            ),
-            transform_failed,
-        )
-        transform_done.otherwise(transform_poll)
+            CfnOutput(self, "AsyncEndpointName", value=endpoint.attr_endpoint_name)
+            CfnOutput(self, "AsyncInferenceSuccessTopicArn", value=async_success_topic.topic_arn)
+            CfnOutput(self, "AsyncInferenceErrorTopicArn", value=async_error_topic.topic_arn)
+        else:
+            # -----------------------------
+            # Transform: createTransformJob.sync
+            # -----------------------------
+            start_transform = sfn.CustomState(
+                self,
+                "StartTransformJob",
+                state_json={
+                    "Type": "Task",
+                    "Resource": f"arn:{self.partition}:states:::sagemaker:createTransformJob.sync",
+                    "Parameters": {
+                        "TransformJobName.$": transform_job_name,
+                        "ModelName": sm_model.attr_model_name,
+                        "TransformInput": {
+                            "DataSource": {
+                                "S3DataSource": {
+                                    "S3DataType": "S3Prefix",
+                                    "S3Uri.$": "$.uris.curatedUri",
+                                }
+                            },
+                            "ContentType": "application/jsonlines",
+                            "SplitType": "Line",
+                        },
+                        "TransformOutput": {
+                            "S3OutputPath.$": "$.uris.predUri",
+                            "AssembleWith": "Line",
+                        },
+                        "TransformResources": {
+                            "InstanceType": "ml.m5.large",
+                            "InstanceCount": 1,
+                        },
+                        # pack as many jsonl lines per request as MaxPayloadInMB allows
+                        "BatchStrategy": "MultiRecord",
+                        "MaxConcurrentTransforms": 2,
+                        "MaxPayloadInMB": 6,
+                    },
+                    "ResultPath": "$.transformJob",
+                },
+            )
+            start_transform.add_catch(
+                transform_failed, errors=["States.ALL"], result_path="$.error"
+            )
+            # Ensure model exists before state machine runs jobs
+            start_transform.node.add_dependency(sm_model)
+            inference_step = start_transform
 
         # -----------------------------
         # State machine entry
         # -----------------------------
-        definition = start_processing.next(describe_processing)
+        definition = (
+            resolve_uris.next(start_processing)
+            .next(inference_step)
+            .next(pipeline_succeeded)
+        )
 
         state_machine = sfn.StateMachine(
             self,
@@ -9,11 +9,15 @@ from aws_cdk import (
     aws_logs as logs,
     aws_sqs as sqs,
     aws_s3 as s3,
+    aws_s3express as s3express,
     aws_kms as kms,
     aws_rds as rds,
     aws_secretsmanager as secretsmanager,
     aws_ecr as ecr,
-    aws_elasticloadbalancingv2 as elbv2
+    aws_elasticloadbalancingv2 as elbv2,
+    aws_applicationautoscaling as appscaling,
+    aws_events as events,
+    aws_events_targets as events_targets,
 )
 from constructs import Construct
 
@@ -21,29 +25,67 @@ from constructs import Construct
 class BaseStack(Stack):
     """
     Base infrastructure stack:
-      - VPC (2 AZ)
+      - VPC (2 AZ) + S3 gateway / AWS API interface endpoints
       - ECS Cluster (Fargate)
       - SQS Queue + DLQ
       - S3 Bucket (SSE-KMS)
+      - S3 Express One Zone directory bucket (optional, hot ML I/O and,
+        with raw_to_hot_bucket, the worker's raw/ writes + nightly archive)
       - KMS CMK
       - IAM Task Roles
       - CloudWatch Logs
     """
 
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        raw_to_hot_bucket: bool = False,
+        logs_to_s3: bool = False,
+        **kwargs,
+    ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         # -----------------------------
         # VPC
         # -----------------------------
+        # No NAT gateway: private subnets are isolated and reach AWS services
+        # only through the endpoints below (public subnets hold the ALB).
+        # Names and the default /18 split match the original VPC, so the
+        # existing subnets keep their logical IDs and CIDRs.
         vpc = ec2.Vpc(
             self,
             "Vpc",
             max_azs=2,
-            nat_gateways=1,  
+            nat_gateways=0,
+            subnet_configuration=[
+                ec2.SubnetConfiguration(name="Public", subnet_type=ec2.SubnetType.PUBLIC),
+                ec2.SubnetConfiguration(name="Private", subnet_type=ec2.SubnetType.PRIVATE_ISOLATED),
+            ],
         )
         self.vpc = vpc
         # -----------------------------
+        # VPC Endpoints
+        # S3 through a gateway endpoint, AWS APIs through interface endpoints;
+        # every AWS call from ECS tasks and SageMaker jobs goes through one of
+        # these. Interface endpoints accept 443 from the VPC CIDR by default,
+        # which covers the SageMaker security group in AnalyticsStack.
+        # -----------------------------
+        vpc.add_gateway_endpoint("S3Gw", service=ec2.GatewayVpcEndpointAwsService.S3)
+        for endpoint_id, service in {
+            "SagemakerApi": ec2.InterfaceVpcEndpointAwsService.SAGEMAKER_API,
+            "SagemakerRuntime": ec2.InterfaceVpcEndpointAwsService.SAGEMAKER_RUNTIME,
+            "EcrApi": ec2.InterfaceVpcEndpointAwsService.ECR,
+            "EcrDocker": ec2.InterfaceVpcEndpointAwsService.ECR_DOCKER,
+            "Logs": ec2.InterfaceVpcEndpointAwsService.CLOUDWATCH_LOGS,
+            "Kms": ec2.InterfaceVpcEndpointAwsService.KMS,
+            "Sqs": ec2.InterfaceVpcEndpointAwsService.SQS,
+            "SecretsManager": ec2.InterfaceVpcEndpointAwsService.SECRETS_MANAGER,  # ECS secret injection
+            "Ssm": ec2.InterfaceVpcEndpointAwsService.SSM,  # API DB settings fallback
+        }.items():
+            vpc.add_interface_endpoint(endpoint_id, service=service)
+        # -----------------------------
         # KMS Key
         # -----------------------------
         data_key = kms.Key(
@@ -76,6 +118,7 @@ class BaseStack(Stack):
             "DataBucket",
             encryption=s3.BucketEncryption.KMS,
             encryption_key=data_key,
+            bucket_key_enabled=True,  # S3 reuses a bucket-level data key instead of calling KMS per object
             block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
             enforce_ssl=True,
             auto_delete_objects=True,         
@@ -83,19 +126,68 @@ class BaseStack(Stack):
         )
         self.bucket = bucket
         # -----------------------------
+        # S3 Express One Zone directory bucket (optional)
+        # Hot path for curated/predictions; enabled with
+        # `-c hot_bucket_az_id=use1-az4` (an AZ *id*, not an AZ name).
+        # -----------------------------
+        self.hot_bucket = None
+        hot_bucket_az_id = self.node.try_get_context("hot_bucket_az_id")
+        if hot_bucket_az_id:
+            self.hot_bucket = s3express.CfnDirectoryBucket(
+                self,
+                "HotBucket",
+                data_redundancy="SingleAvailabilityZone",
+                location_name=hot_bucket_az_id,
+                bucket_encryption=s3express.CfnDirectoryBucket.BucketEncryptionProperty(
+                    server_side_encryption_configuration=[
+                        s3express.CfnDirectoryBucket.ServerSideEncryptionRuleProperty(
+                            # directory buckets require the bucket key with SSE-KMS
+                            bucket_key_enabled=True,
+                            server_side_encryption_by_default=s3express.CfnDirectoryBucket.ServerSideEncryptionByDefaultProperty(
+                                sse_algorithm="aws:kms",
+                                kms_master_key_id=data_key.key_arn,
+                            ),
+                        )
+                    ]
+                ),
+            )
+        if self.hot_bucket is not None:
+            # zonal S3 Express endpoints (CreateSession + object I/O)
+            vpc.add_gateway_endpoint(
+                "S3ExpressGw", service=ec2.GatewayVpcEndpointAwsService("s3express")
+            )
+        if raw_to_hot_bucket and self.hot_bucket is None:
+            raise ValueError("raw_to_hot_bucket requires the hot_bucket_az_id context")
+        # worker writes raw/ (and quarantine/) here; the analytics stack reads it
+        self.raw_on_hot_bucket = raw_to_hot_bucket
+        raw_bucket_name = self.hot_bucket.ref if raw_to_hot_bucket else bucket.bucket_name
+        # -----------------------------
         # SQS + DLQ
         # -----------------------------
         dlq = sqs.Queue(
             self,
             "PaymentsDlq",
             retention_period=Duration.days(14),
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
         )
 
+        # Consumer settings, shared by the queue and the worker's ReceiveMessage
+        # calls (SQS_* env) so the two can't drift apart
+        sqs_max_messages = 10   # SQS per-call maximum
+        sqs_wait_seconds = 20   # long polling
+        # receipts now wait on the worker's work queue, a delete batch and
+        # (with RAW_BATCHING) a micro-batch flush before being deleted; 300s
+        # leaves room for that instead of redelivering work still in flight
+        sqs_visibility_seconds = 300
+
         queue = sqs.Queue(
             self,
             "PaymentsQueue",
-            visibility_timeout=Duration.seconds(60),
+            visibility_timeout=Duration.seconds(sqs_visibility_seconds),
+            receive_message_wait_time=Duration.seconds(sqs_wait_seconds),  # long polling by default
             retention_period=Duration.days(4),
+            # SSE-SQS: encrypted at rest without a KMS call per send/receive
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
             dead_letter_queue=sqs.DeadLetterQueue(
                 max_receive_count=5,
                 queue=dlq,
@@ -141,7 +233,7 @@ class BaseStack(Stack):
                 version=rds.PostgresEngineVersion.VER_15 
             ),
             vpc=vpc,
-            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_ISOLATED),
             instance_type=ec2.InstanceType.of(ec2.InstanceClass.T4G, ec2.InstanceSize.MICRO),
             multi_az=False,              
             allocated_storage=20,
@@ -150,6 +242,7 @@ class BaseStack(Stack):
             credentials=rds.Credentials.from_secret(db_secret),
             database_name=db_name,
             security_groups=[db_sg],
+            iam_authentication=True,
             publicly_accessible=False,
             backup_retention=Duration.days(1),
             deletion_protection=False,
@@ -181,6 +274,14 @@ class BaseStack(Stack):
             repository_name="mortgage-publisher",
         )
 
+        # Immutable image references: deploy.ps1 passes each pushed digest as
+        # -c <name>_image_digest=sha256:...; a mutable tag is re-resolved on
+        # every task launch, a digest lets Fargate reuse cached layers.
+        # Falls back to :latest (local/dev synth).
+        def ecr_image(repo: ecr.IRepository, name: str) -> ecs.ContainerImage:
+            digest = self.node.try_get_context(f"{name}_image_digest")
+            return ecs.ContainerImage.from_ecr_repository(repo, tag=digest or "latest")
+
         # -----------------------------
         # ECS Cluster
         # -----------------------------
@@ -188,6 +289,7 @@ class BaseStack(Stack):
             self,
             "Cluster",
             vpc=vpc,
+            enable_fargate_capacity_providers=True,
         )
 
         # -----------------------------
@@ -200,6 +302,42 @@ class BaseStack(Stack):
             removal_policy=RemovalPolicy.DESTROY,
         )
 
+        # High-volume services can ship logs through a FireLens (Fluent Bit)
+        # sidecar that batches them into s3://<data bucket>/logs/ instead of
+        # PutLogEvents per line; the router's own logs stay in CloudWatch.
+        def service_logging(task_role, stream_prefix: str) -> ecs.LogDriver:
+            if not logs_to_s3:
+                return ecs.LogDrivers.aws_logs(stream_prefix=stream_prefix, log_group=log_group)
+            bucket.grant_put(task_role, "logs/*")
+            return ecs.LogDrivers.firelens(
+                options={
+                    "Name": "s3",
+                    "bucket": bucket.bucket_name,
+                    "region": self.region,
+                    "total_file_size": "50M",
+                    "upload_timeout": "10s",
+                    "compression": "gzip",
+                    "s3_key_format": f"/logs/{stream_prefix}/%Y/%m/%d/%H/$UUID.gz",
+                }
+            )
+
+        # Add after the app container: the first essential container becomes
+        # the task's default container, which load balancer targets use.
+        def add_log_router(task_def, stream_prefix: str) -> None:
+            if not logs_to_s3:
+                return
+            task_def.add_firelens_log_router(
+                "LogRouter",
+                # AWS's regional ECR copy of aws-for-fluent-bit, pulled through
+                # the ECR endpoints (public.ecr.aws is unreachable without NAT)
+                image=ecs.ContainerImage.from_registry(
+                    f"906394416424.dkr.ecr.{self.region}.amazonaws.com/aws-for-fluent-bit:stable"
+                ),
+                firelens_config=ecs.FirelensConfig(type=ecs.FirelensLogRouterType.FLUENTBIT),
+                memory_reservation_mib=50,
+                logging=ecs.LogDrivers.aws_logs(stream_prefix=f"{stream_prefix}-firelens", log_group=log_group),
+            )
+
         # -----------------------------
         # IAM Task Roles
         # -----------------------------
@@ -211,12 +349,6 @@ class BaseStack(Stack):
             assumed_by=iam.ServicePrincipal("ecs-tasks.amazonaws.com"),
             description="Task role for API service",
         )
-        api_task_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=["sqs:SendMessage"],
-                resources=[queue.queue_arn],
-            )
-        )
         # -----------------------------
         # API Task Definition
         # -----------------------------
@@ -230,25 +362,57 @@ class BaseStack(Stack):
 
         api_container = api_task_def.add_container(
             "ApiContainer",
-            image=ecs.ContainerImage.from_ecr_repository(api_repo, tag="latest"),
+            # deploy.ps1 pushes a SOCI index next to the image; Fargate detects it
+            # in ECR and lazy-loads layers instead of pulling the whole image
+            image=ecr_image(api_repo, "api"),
             environment={
                 "DB_HOST": db_instance.instance_endpoint.hostname,
                 "DB_PORT": str(db_instance.instance_endpoint.port),
                 "DB_NAME": db_name,
-                "QUEUE_URL": queue.queue_url,
                 "AWS_REGION": self.region,
             },
             secrets={
                 "DB_USER": ecs.Secret.from_secrets_manager(db_secret, field="username"),
                 "DB_PASSWORD": ecs.Secret.from_secrets_manager(db_secret, field="password"),
             },
-            logging=ecs.LogDrivers.aws_logs(stream_prefix="api", log_group=log_group),
+            logging=service_logging(api_task_role, "api"),
         )
+        add_log_router(api_task_def, "api")
 
         api_container.add_port_mappings(
             ecs.PortMapping(container_port=8080)
         )
 
+        # -----------------------------
+        # Schema migration (one-shot task, API image)
+        # Run after deploy: aws ecs run-task --task-definition <MigrateTaskDefArn> ...
+        # -----------------------------
+        migrate_task_def = ecs.FargateTaskDefinition(
+            self,
+            "MigrateTaskDef",
+            cpu=256,
+            memory_limit_mib=512,
+        )
+        migrate_task_def.add_container(
+            "MigrateContainer",
+            image=ecr_image(api_repo, "api"),
+            command=["alembic", "upgrade", "head"],
+            environment={
+                "DB_HOST": db_instance.instance_endpoint.hostname,
+                "DB_PORT": str(db_instance.instance_endpoint.port),
+                "DB_NAME": db_name,
+                "AWS_REGION": self.region,
+            },
+            secrets={
+                "DB_USER": ecs.Secret.from_secrets_manager(db_secret, field="username"),
+                "DB_PASSWORD": ecs.Secret.from_secrets_manager(db_secret, field="password"),
+            },
+            logging=ecs.LogDrivers.aws_logs(stream_prefix="migrate", log_group=log_group),
+        )
+        migrate_task_def.execution_role.add_managed_policy(
+            iam.ManagedPolicy.from_aws_managed_policy_name("service-role/AmazonECSTaskExecutionRolePolicy")
+        )
+
         # Publisher Role（outbox）
         publisher_task_role = iam.Role(
             self,
@@ -272,7 +436,7 @@ class BaseStack(Stack):
 
         publisher_task_def.add_container(
             "PublisherContainer",
-            image=ecs.ContainerImage.from_ecr_repository(publisher_repo, tag="latest"),
+            image=ecr_image(publisher_repo, "publisher"),
             environment={
                 "DB_HOST": db_instance.instance_endpoint.hostname,
                 "DB_PORT": str(db_instance.instance_endpoint.port),
@@ -336,7 +500,7 @@ class BaseStack(Stack):
             desired_count=1,
             assign_public_ip=False,
             security_groups=[api_sg],
-            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_ISOLATED),
         )
         listener.add_targets(
             "ApiTargets",
@@ -357,34 +521,42 @@ class BaseStack(Stack):
             "WorkerTaskRole",
             assumed_by=iam.ServicePrincipal("ecs-tasks.amazonaws.com"),
             description="Task role for worker service",
+            inline_policies={
+                "WorkerAccess": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=[
+                                "sqs:ReceiveMessage",
+                                "sqs:DeleteMessage",
+                                "sqs:ChangeMessageVisibility",
+                                "sqs:GetQueueAttributes",
+                            ],
+                            resources=[queue.queue_arn],
+                        ),
+                        iam.PolicyStatement(
+                            actions=["s3:PutObject"],
+                            resources=[bucket.arn_for_objects("raw/*")],
+                        ),
+                        iam.PolicyStatement(
+                            actions=[
+                                "kms:Encrypt",
+                                "kms:Decrypt",
+                                "kms:GenerateDataKey",
+                            ],
+                            resources=[data_key.key_arn],
+                        ),
+                    ]
+                )
+            },
         )
-        worker_task_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=[
-                    "sqs:ReceiveMessage",
-                    "sqs:DeleteMessage",
-                    "sqs:ChangeMessageVisibility",
-                    "sqs:GetQueueAttributes",
-                ],
-                resources=[queue.queue_arn],
-            )
-        )
-        worker_task_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=["s3:PutObject"],
-                resources=[bucket.arn_for_objects("raw/*")],
-            )
-        )
-        worker_task_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=[
-                    "kms:Encrypt",
-                    "kms:Decrypt",
-                    "kms:GenerateDataKey",
-                ],
-                resources=[data_key.key_arn],
+        if raw_to_hot_bucket:
+            # directory buckets authorize object I/O through CreateSession
+            worker_task_role.add_to_policy(
+                iam.PolicyStatement(
+                    actions=["s3express:CreateSession"],
+                    resources=[self.hot_bucket.attr_arn],
+                )
             )
-        )
 
         # Add execution role policy
         api_task_def.execution_role.add_managed_policy(
@@ -392,48 +564,37 @@ class BaseStack(Stack):
         )
 
         # -----------------------------
-        # Fargate Task Definitions
+        # Worker Task Definition
         # -----------------------------
-        def make_task_def(name: str, role: iam.IRole) -> ecs.FargateTaskDefinition:
-            task_def = ecs.FargateTaskDefinition(
-                self,
-                f"{name}TaskDef",
-                cpu=256,
-                memory_limit_mib=512,
-                task_role=role,
-            )
-            task_def.add_container(
-                f"{name}Container",
-                image=ecs.ContainerImage.from_registry(
-                    "public.ecr.aws/docker/library/amazonlinux:2023"
-                ),
-                command=["/bin/sh", "-c", "echo booted && sleep 3600"],
-                logging=ecs.LogDrivers.aws_logs(
-                    stream_prefix=name.lower(),
-                    log_group=log_group,
-                ),
-            )
-            return task_def
-
         worker_task_def = ecs.FargateTaskDefinition(
             self,
             "WorkerTaskDef",
-            cpu=256,
-            memory_limit_mib=512,
+            cpu=1024,
+            memory_limit_mib=2048,
             task_role=worker_task_role,
+            # Graviton; the worker image is built for linux/arm64
+            runtime_platform=ecs.RuntimePlatform(
+                cpu_architecture=ecs.CpuArchitecture.ARM64,
+                operating_system_family=ecs.OperatingSystemFamily.LINUX,
+            ),
         )
 
         worker_task_def.add_container(
             "WorkerContainer",
-            image=ecs.ContainerImage.from_ecr_repository(worker_repo, tag="latest"),
+            # SOCI-indexed by deploy.ps1 (lazy image pull on Fargate)
+            image=ecr_image(worker_repo, "worker"),
             environment={
                 "QUEUE_URL": queue.queue_url,
-                "BUCKET": bucket.bucket_name,
+                "BUCKET": raw_bucket_name,
                 "AWS_REGION": self.region,
                 "PREFIX": "raw",
+                "SQS_MAX_MESSAGES": str(sqs_max_messages),
+                "SQS_WAIT_SECONDS": str(sqs_wait_seconds),
+                "SQS_VISIBILITY_TIMEOUT": str(sqs_visibility_seconds),
             },
-            logging=ecs.LogDrivers.aws_logs(stream_prefix="worker", log_group=log_group),
+            logging=service_logging(worker_task_role, "worker"),
         )
+        add_log_router(worker_task_def, "worker")
 
         worker_task_def.execution_role.add_managed_policy(
             iam.ManagedPolicy.from_aws_managed_policy_name("service-role/AmazonECSTaskExecutionRolePolicy")
@@ -442,18 +603,41 @@ class BaseStack(Stack):
         # -----------------------------
         # ECS Service
         # -----------------------------
-        ecs.FargateService(
+        worker_service = ecs.FargateService(
             self,
             "WorkerService",
             cluster=cluster,
             task_definition=worker_task_def,
-            desired_count=1,
+            min_healthy_percent=100,
+            # interrupted Spot tasks just leave messages to reappear after the
+            # visibility timeout (DLQ after 5 receives); base=1 keeps one
+            # on-demand task so the queue never goes unconsumed
+            capacity_provider_strategies=[
+                ecs.CapacityProviderStrategy(capacity_provider="FARGATE_SPOT", weight=4),
+                ecs.CapacityProviderStrategy(capacity_provider="FARGATE", weight=1, base=1),
+            ],
             assign_public_ip=False,
             security_groups=[service_sg],
             vpc_subnets=ec2.SubnetSelection(
-                subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS
+                subnet_type=ec2.SubnetType.PRIVATE_ISOLATED
             ),
         )
+
+        # task count follows the queue backlog instead of a fixed desired_count
+        worker_scaling = worker_service.auto_scale_task_count(min_capacity=1, max_capacity=10)
+        worker_scaling.scale_on_metric(
+            "WorkerQueueDepthScaling",
+            metric=queue.metric_approximate_number_of_messages_visible(
+                period=Duration.minutes(1),
+            ),
+            scaling_steps=[
+                appscaling.ScalingInterval(upper=100, change=-1),
+                appscaling.ScalingInterval(lower=500, change=+1),
+                appscaling.ScalingInterval(lower=5000, change=+3),
+            ],
+            adjustment_type=appscaling.AdjustmentType.CHANGE_IN_CAPACITY,
+            cooldown=Duration.minutes(2),
+        )
         ecs.FargateService(
             self,
             "PublisherService",
@@ -462,18 +646,97 @@ class BaseStack(Stack):
             desired_count=1,
             assign_public_ip=False,
             security_groups=[service_sg],
-            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_ISOLATED),
         )
 
+        if raw_to_hot_bucket:
+            # -----------------------------
+            # Nightly archive: hot raw/ -> SSE-KMS data bucket (long-term copy)
+            # -----------------------------
+            archive_task_role = iam.Role(
+                self,
+                "RawArchiveTaskRole",
+                assumed_by=iam.ServicePrincipal("ecs-tasks.amazonaws.com"),
+                description="Task role for the nightly raw/ archive copy",
+            )
+            archive_task_role.add_to_policy(
+                iam.PolicyStatement(
+                    actions=["s3express:CreateSession"],
+                    resources=[self.hot_bucket.attr_arn],
+                )
+            )
+            bucket.grant_read_write(archive_task_role, "raw/*")
+            data_key.grant_encrypt_decrypt(archive_task_role)
+
+            archive_task_def = ecs.FargateTaskDefinition(
+                self,
+                "RawArchiveTaskDef",
+                cpu=512,
+                memory_limit_mib=1024,
+                task_role=archive_task_role,
+                runtime_platform=ecs.RuntimePlatform(
+                    cpu_architecture=ecs.CpuArchitecture.ARM64,
+                    operating_system_family=ecs.OperatingSystemFamily.LINUX,
+                ),
+            )
+            # worker image (private ECR, reachable without a NAT gateway)
+            archive_task_def.add_container(
+                "RawArchiveContainer",
+                image=ecr_image(worker_repo, "worker"),
+                command=["python", "archive.py"],
+                environment={
+                    "SRC_BUCKET": raw_bucket_name,
+                    "DEST_BUCKET": bucket.bucket_name,
+                    "AWS_REGION": self.region,
+                    "PREFIX": "raw",
+                },
+                logging=ecs.LogDrivers.aws_logs(stream_prefix="raw-archive", log_group=log_group),
+            )
+            archive_task_def.execution_role.add_managed_policy(
+                iam.ManagedPolicy.from_aws_managed_policy_name("service-role/AmazonECSTaskExecutionRolePolicy")
+            )
+
+            events.Rule(
+                self,
+                "RawArchiveSchedule",
+                schedule=events.Schedule.cron(minute="0", hour="3"),
+                targets=[
+                    events_targets.EcsTask(
+                        cluster=cluster,
+                        task_definition=archive_task_def,
+                        security_groups=[service_sg],
+                        subnet_selection=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_ISOLATED),
+                    )
+                ],
+            )
+
         # Allow tasks to read DB credentials secret
         db_secret.grant_read(api_task_role)
         db_secret.grant_read(publisher_task_role)
         db_secret.grant_read(worker_task_role)
 
+        # Optional IAM DB auth for the API (DB_IAM_AUTH=1, DB_IAM_USER=api_iam);
+        # the master user keeps password auth for migrations
+        db_instance.grant_connect(api_task_role, "api_iam")
+
         CfnOutput(self, "PaymentsQueueUrl", value=queue.queue_url)
+        CfnOutput(
+            self,
+            "WorkerReceiveSettings",
+            value=(
+                f"SQS_MAX_MESSAGES={sqs_max_messages} "
+                f"SQS_WAIT_SECONDS={sqs_wait_seconds} "
+                f"SQS_VISIBILITY_TIMEOUT={sqs_visibility_seconds}"
+            ),
+        )
         CfnOutput(self, "DataBucketName", value=bucket.bucket_name)
+        if self.hot_bucket is not None:
+            CfnOutput(self, "HotBucketName", value=self.hot_bucket.ref)
         CfnOutput(self, "AlbDnsName", value=alb.load_balancer_dns_name)
         CfnOutput(self, "DbEndpoint", value=db_instance.instance_endpoint.hostname)
         CfnOutput(self, "DbPort", value=str(db_instance.instance_endpoint.port))
         CfnOutput(self, "DbName", value=db_name)
         CfnOutput(self, "DbSecretArn", value=db_secret.secret_arn)
+        CfnOutput(self, "MigrateTaskDefArn", value=migrate_task_def.task_definition_arn)
+        CfnOutput(self, "ClusterName", value=cluster.cluster_name)
+        CfnOutput(self, "ServiceSecurityGroupId", value=service_sg.security_group_id)
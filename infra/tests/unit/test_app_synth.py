@@ -0,0 +1,61 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+
+from infra.stacks.analytics_stack import AnalyticsStack
+from infra.stacks.base_stack import BaseStack
+
+ENV = core.Environment(account="123456789012", region="us-east-1")
+
+
+def synth(**base_kwargs):
+    app = core.App()
+    base = BaseStack(app, "MortgagePipelineBaseStack", env=ENV, **base_kwargs)
+    analytics = AnalyticsStack(
+        app, "MortgageAnalyticsStack",
+        env=ENV,
+        vpc=base.vpc,
+        bucket=base.bucket,
+        data_key=base.data_key,
+        hot_bucket=base.hot_bucket,
+        raw_on_hot_bucket=base.raw_on_hot_bucket,
+    )
+    return (
+        assertions.Template.from_stack(base),
+        assertions.Template.from_stack(analytics),
+    )
+
+
+def test_default_app_synthesizes():
+    base, analytics = synth()
+    base.resource_count_is("AWS::ECS::Service", 3)
+    base.has_resource_properties("AWS::SQS::Queue", {"VisibilityTimeout": 300})
+    analytics.resource_count_is("AWS::EC2::SecurityGroup", 1)
+
+
+def test_vpc_keeps_the_original_subnet_cidrs():
+    base, _ = synth()
+    base.resource_count_is("AWS::EC2::NatGateway", 0)
+    subnets = base.find_resources("AWS::EC2::Subnet")
+    assert {
+        logical_id[: logical_id.index("Subnet") + 7]: props["Properties"]["CidrBlock"]
+        for logical_id, props in subnets.items()
+    } == {
+        "VpcPublicSubnet1": "10.0.0.0/18",
+        "VpcPublicSubnet2": "10.0.64.0/18",
+        "VpcPrivateSubnet1": "10.0.128.0/18",
+        "VpcPrivateSubnet2": "10.0.192.0/18",
+    }
+
+
+def test_logs_to_s3_adds_router_after_app_container():
+    base, _ = synth(logs_to_s3=True)
+    for container in ("ApiContainer", "WorkerContainer"):
+        base.has_resource_properties(
+            "AWS::ECS::TaskDefinition",
+            {
+                "ContainerDefinitions": [
+                    assertions.Match.object_like({"Name": container}),
+                    assertions.Match.object_like({"Name": "LogRouter"}),
+                ]
+            },
+        )
@@ -1,17 +1,34 @@
 # serve.py
+import os
+
 from fastapi import FastAPI, Request
+from fastapi.responses import Response
 import uvicorn
 
 app = FastAPI()
 
 @app.post("/invocations")
 async def invocations(req: Request):
-    body = await req.body()
-    return body.decode("utf-8")
+    # echo the payload as-is, without decoding it. Read the whole body before
+    # responding: streaming req.stream() back makes the response's disconnect
+    # listener compete with the body reader for receive(), truncating payloads
+    return Response(
+        content=await req.body(),
+        media_type=req.headers.get("content-type", "application/octet-stream"),
+    )
 
 @app.get("/ping")
 def ping():
     return {"status": "ok"}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    uvicorn.run(
+        "serve:app",
+        host="0.0.0.0",
+        port=8080,
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        loop="uvloop",
+        http="httptools",
+        log_level="warning",
+        access_log=False,
+    )
@@ -6,48 +6,62 @@ echo "AWS Account: $AWS_ACCOUNT"
 echo "Region: $AWS_REGION"
 echo ""
 
+$REGISTRY = "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com"
+
+# SOCI index: Fargate finds it in ECR and lazy-loads image layers, so tasks
+# start before the full image is pulled. Needs the soci-snapshotter CLI and
+# containerd (Linux); skipped when soci is not installed.
+function Push-SociIndex($Image, $Platform) {
+    if (-not (Get-Command soci -ErrorAction SilentlyContinue)) {
+        echo "soci not found, skipping SOCI index for $Image"
+        return
+    }
+    $password = aws ecr get-login-password --region $AWS_REGION
+    sudo ctr image pull --platform $Platform --user "AWS:$password" $Image
+    sudo soci create --platform $Platform $Image
+    sudo soci push --platform $Platform --user "AWS:$password" $Image
+}
+
 # ECR Login
-echo "[1/8] Logging into ECR..."
+echo "[1/6] Logging into ECR..."
 aws ecr get-login-password --region $AWS_REGION | docker login --username AWS --password-stdin "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com"
 
 # Build API
-echo "[2/8] Building API image..."
+echo "[2/6] Building API image..."
 cd services/api
 docker build -t mortgage-api:latest .
 docker tag mortgage-api:latest "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com/mortgage-api:latest"
 docker push "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com/mortgage-api:latest"
+Push-SociIndex "$REGISTRY/mortgage-api:latest" "linux/amd64"
 
 # Build Worker
-echo "[3/8] Building Worker image..."
+echo "[3/6] Building Worker image..."
 cd ../worker
-docker build -t mortgage-worker:latest .
-docker tag mortgage-worker:latest "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com/mortgage-worker:latest"
-docker push "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com/mortgage-worker:latest"
+# WorkerTaskDef runs on Graviton (ARM64) Fargate
+docker buildx build --platform linux/arm64 -t "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com/mortgage-worker:latest" --push .
+Push-SociIndex "$REGISTRY/mortgage-worker:latest" "linux/arm64"
 
 # Build Publisher
-echo "[4/8] Building Publisher image..."
+echo "[4/6] Building Publisher image..."
 cd ../publisher
 docker build -t mortgage-publisher:latest .
 docker tag mortgage-publisher:latest "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com/mortgage-publisher:latest"
 docker push "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com/mortgage-publisher:latest"
 
-# Build ML Processing
-echo "[5/8] Building Publisher image..."
-cd ../..//ml/processing
-docker build -t mortgage-processing:latest .
-docker tag mortgage-processing:latest "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com/mortgage-processing:latest"
-docker push "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com/mortgage-processing:latest"
-
-# Build ML Inference
-echo "[6/8] Building Publisher image..."
-cd ../../ml/inference
-docker build -t mortgage-inference:latest .
-docker tag mortgage-inference:latest "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com/mortgage-inference:latest"
-docker push "$AWS_ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com/mortgage-inference:latest"
-
-# Deploy
-echo "[7/8] Deploying infrastructure..."
+# Deploy (ML processing/inference images are built and pushed by CDK as assets)
+echo "[5/6] Deploying infrastructure..."
 cd ../../infra
-cdk deploy --all 
+$env:AWS_SDK_LOAD_CONFIG = "1"
+$env:AWS_MAX_ATTEMPTS = "10"
+# Don't capture a JS stack trace for every construct during synth
+$env:CDK_DISABLE_STACK_TRACE = "1"
+# Assets publish in parallel; stacks deploy concurrently where add_dependency allows
+# Pin the services to the digests just pushed (immutable, cache-friendly)
+$digestArgs = foreach ($name in "api", "worker", "publisher") {
+    $digest = aws ecr describe-images --region $AWS_REGION --repository-name "mortgage-$name" `
+        --image-ids imageTag=latest --query "imageDetails[0].imageDigest" --output text
+    "-c"; "$($name)_image_digest=$digest"
+}
+cdk deploy --all --concurrency 4 --asset-parallelism @digestArgs
 
-echo "[8/8] Done! ✅"
\ No newline at end of file
+echo "[6/6] Done! ✅"
\ No newline at end of file
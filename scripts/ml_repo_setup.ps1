@@ -1,5 +1,7 @@
 # ================================
-# ECR setup + build + push (Windows / PowerShell)
+# ECR setup (Windows / PowerShell)
+# The repos hold the BuildKit layer cache (:buildcache) for the ML images;
+# the images themselves are built and published by `cdk deploy`.
 # ================================
 
 $Region = "us-east-1"
@@ -65,42 +67,8 @@ if ($LASTEXITCODE -ne 0) {
     exit 1
 }
 
-# -------------------------------
-# 3) Build + tag + push mortgage-processing
-# -------------------------------
-Write-Host "Building mortgage-processing image..."
-
-Set-Location "ml\processing"
-
-docker build -t mortgage-processing:latest .
-
-docker tag mortgage-processing:latest `
-    "$AccountId.dkr.ecr.$Region.amazonaws.com/mortgage-processing:latest"
-
-docker push `
-    "$AccountId.dkr.ecr.$Region.amazonaws.com/mortgage-processing:latest"
-
-Set-Location "..\.."
-
-# -------------------------------
-# 4) Build + tag + push mortgage-inference
-# -------------------------------
-Write-Host "Building mortgage-inference image..."
-
-Set-Location "ml\inference"
-
-docker build -t mortgage-inference:latest .
-
-docker tag mortgage-inference:latest `
-    "$AccountId.dkr.ecr.$Region.amazonaws.com/mortgage-inference:latest"
-
-docker push `
-    "$AccountId.dkr.ecr.$Region.amazonaws.com/mortgage-inference:latest"
-
-Set-Location "..\.."
-
 Write-Host "All done."
-Write-Host "Repos pushed:"
+Write-Host "Build cache repos:"
 foreach ($Repo in $Repos) {
-    Write-Host " - $AccountId.dkr.ecr.$Region.amazonaws.com/$Repo:latest"
+    Write-Host " - $AccountId.dkr.ecr.$Region.amazonaws.com/$Repo:buildcache"
 }
@@ -0,0 +1,45 @@
+"""initial schema: payments + outbox_events
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-15
+
+Databases previously created by Base.metadata.create_all already match this
+revision; mark them with `alembic stamp 0001` instead of upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "payments",
+        sa.Column("payment_id", sa.String(64), primary_key=True),
+        sa.Column("amount", sa.Numeric(12, 2), nullable=False),
+        sa.Column("ts", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "outbox_events",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("aggregate_type", sa.String(64), nullable=False),
+        sa.Column("aggregate_id", sa.String(64), nullable=False),
+        sa.Column("event_type", sa.String(64), nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("published_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("idx_outbox_poll", "outbox_events", ["status", "available_at", "created_at"])
+
+def downgrade() -> None:
+    op.drop_index("idx_outbox_poll", table_name="outbox_events")
+    op.drop_table("outbox_events")
+    op.drop_table("payments")
@@ -0,0 +1,26 @@
+"""partial outbox poll index (pending rows only)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.drop_index("idx_outbox_poll", table_name="outbox_events")
+    op.create_index(
+        "idx_outbox_poll_pending",
+        "outbox_events",
+        ["available_at", "created_at"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+def downgrade() -> None:
+    op.drop_index("idx_outbox_poll_pending", table_name="outbox_events")
+    op.create_index("idx_outbox_poll", "outbox_events", ["status", "available_at", "created_at"])
@@ -0,0 +1,31 @@
+"""NOTIFY outbox_new on outbox inserts so the publisher can LISTEN instead of polling
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE FUNCTION outbox_notify() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('outbox_new', '');
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER t_outbox_notify
+        AFTER INSERT ON outbox_events
+        FOR EACH STATEMENT EXECUTE FUNCTION outbox_notify()
+    """)
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER t_outbox_notify ON outbox_events")
+    op.execute("DROP FUNCTION outbox_notify()")
@@ -1,41 +1,106 @@
 import os
 import time
+import functools
 import boto3
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-def _get_env(name: str, retries=5, delay=2) -> str:
-    v = os.getenv(name)
-    if v:
-        return v
-    for _ in range(retries):
-        time.sleep(delay)
-        v = os.getenv(name)
-        if v:
-            return v
-    # fallback: try SSM parameter (optional)
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+DB_ENV_VARS = ("DB_HOST", "DB_PORT", "DB_NAME", "DB_USER", "DB_PASSWORD")
+# With IAM auth the login comes from DB_IAM_USER instead: ECS keeps injecting
+# the secret's DB_USER/DB_PASSWORD, which are then ignored
+IAM_DB_ENV_VARS = ("DB_HOST", "DB_PORT", "DB_NAME", "DB_IAM_USER")
+
+# IAM auth tokens are valid for 15 minutes; refresh a bit before that
+IAM_TOKEN_TTL_SECONDS = 14 * 60
+
+def iam_auth_enabled() -> bool:
+    return os.getenv("DB_IAM_AUTH", "").lower() in ("1", "true", "yes")
+
+def _load_db_env() -> dict[str, str]:
+    # ECS injects env/secrets before the process starts, so there is nothing
+    # to wait for; anything still missing comes from SSM in one call
+    names = IAM_DB_ENV_VARS if iam_auth_enabled() else DB_ENV_VARS
+    values = {name: os.getenv(name) for name in names}
+    missing = [name for name, v in values.items() if not v]
+    if not missing:
+        return values
+
+    # fallback: try SSM parameters (optional)
+    params = {f"/mortgage/{name.lower()}": name for name in missing}
     try:
         ssm = boto3.client("ssm", region_name=os.getenv("AWS_REGION"))
-        param = ssm.get_parameter(Name=f"/mortgage/{name.lower()}", WithDecryption=True)
-        return param["Parameter"]["Value"]
+        resp = ssm.get_parameters(Names=list(params), WithDecryption=True)
     except Exception:
-        raise RuntimeError(f"Missing env var: {name}")
+        raise RuntimeError(f"Missing env vars: {', '.join(missing)}")
+    for p in resp["Parameters"]:
+        values[params[p["Name"]]] = p["Value"]
+
+    missing = [name for name in missing if not values[name]]
+    if missing:
+        raise RuntimeError(f"Missing env vars: {', '.join(missing)}")
+    return values
 
+@functools.lru_cache(maxsize=None)
 def make_db_url() -> str:
-    host = _get_env("DB_HOST")
-    port = _get_env("DB_PORT")
-    db   = _get_env("DB_NAME")
-    user = _get_env("DB_USER")
-    pw   = _get_env("DB_PASSWORD")
-    # psycopg2
-    return f"postgresql+psycopg2://{user}:{pw}@{host}:{port}/{db}"
-
-engine = create_engine(
-    make_db_url(),
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-)
-
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    env = _load_db_env()
+    # psycopg2; with IAM auth the password is injected per connection
+    userinfo = env["DB_IAM_USER"] if iam_auth_enabled() else f"{env['DB_USER']}:{env['DB_PASSWORD']}"
+    return (
+        "postgresql+psycopg2://"
+        f"{userinfo}"
+        f"@{env['DB_HOST']}:{env['DB_PORT']}/{env['DB_NAME']}"
+    )
+
+_iam_token: tuple[str, float] | None = None
+
+def _cached_iam_token() -> str:
+    global _iam_token
+    now = time.monotonic()
+    if _iam_token is None or now - _iam_token[1] > IAM_TOKEN_TTL_SECONDS:
+        env = _load_db_env()
+        rds = boto3.client("rds", region_name=os.getenv("AWS_REGION"))
+        token = rds.generate_db_auth_token(
+            DBHostname=env["DB_HOST"],
+            Port=int(env["DB_PORT"]),
+            DBUsername=env["DB_IAM_USER"],
+        )
+        _iam_token = (token, now)
+    return _iam_token[0]
+
+def create_db_engine(**kwargs) -> Engine:
+    # TCP keepalives stop idle pooled connections from being dropped by
+    # NAT/LB idle timeouts, so quiet periods don't cost a fresh handshake
+    connect_args = {"keepalives": 1, "keepalives_idle": 30, "keepalives_interval": 10}
+    if iam_auth_enabled():
+        connect_args["sslmode"] = "require"  # RDS only accepts tokens over TLS
+
+    engine = create_engine(make_db_url(), connect_args=connect_args, **kwargs)
+
+    if iam_auth_enabled():
+        @event.listens_for(engine, "do_connect")
+        def _inject_iam_token(dialect, conn_rec, cargs, cparams):
+            cparams["password"] = _cached_iam_token()
+
+    return engine
+
+# Created on first use (the app's startup hook), not at import time, so
+# `import db` never blocks on SSM/DNS/TCP.
+_engine: Engine | None = None
+_SessionLocal: sessionmaker | None = None
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        _engine = create_db_engine(
+            pool_pre_ping=True,
+            pool_size=5,
+            max_overflow=10,
+            pool_timeout=30,
+        )
+    return _engine
+
+def get_session() -> Session:
+    global _SessionLocal
+    if _SessionLocal is None:
+        _SessionLocal = sessionmaker(bind=get_engine(), autocommit=False, autoflush=False)
+    return _SessionLocal()
@@ -1,16 +1,38 @@
+import os
+import uuid
+
 from fastapi import FastAPI, HTTPException
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import text
 
-from db import SessionLocal, engine
-from models import Base, Payment, OutboxEvent
+from db import get_engine, get_session
+from models import Base
 from schema import PaymentIn, PaymentOut
 
 app = FastAPI()
 
+# Payment row + its outbox event in one statement (one round trip, one
+# implicit transaction); a duplicate payment_id fails the whole statement.
+INSERT_PAYMENT_WITH_EVENT = text("""
+    WITH p AS (
+        INSERT INTO payments (payment_id, amount, ts)
+        VALUES (:pid, :amount, :ts)
+    )
+    INSERT INTO outbox_events
+        (id, aggregate_type, aggregate_id, event_type, payload, status, attempts)
+    VALUES
+        (CAST(:event_id AS uuid), 'payment', :pid, 'PaymentCreated',
+         CAST(:payload AS jsonb), 'pending', 0)
+""")
+
 @app.on_event("startup")
 def on_startup():
-    Base.metadata.create_all(bind=engine)
+    # first (and only) engine creation happens here, after env is resolved
+    engine = get_engine()
+    # Schema is managed by Alembic (`alembic upgrade head`, MigrateTaskDef in
+    # ECS); create_all is only for local dev.
+    if os.getenv("AUTO_CREATE_SCHEMA"):
+        Base.metadata.create_all(bind=engine)
 
 @app.get("/health")
 def health():
@@ -18,20 +40,19 @@ def health():
 
 @app.post("/payments", response_model=PaymentOut)
 def create_payment(p: PaymentIn):
-    db = SessionLocal()
+    db = get_session()
     try:
-        pay = Payment(payment_id=p.payment_id, amount=p.amount, ts=p.ts)
-        db.add(pay)
-
-        evt = OutboxEvent(
-            aggregate_type="payment",
-            aggregate_id=p.payment_id,
-            event_type="PaymentCreated",
-            payload=p.model_dump(mode="json"),   # jsonb
-            status="pending",
+        db.execute(
+            INSERT_PAYMENT_WITH_EVENT,
+            {
+                "pid": p.payment_id,
+                "amount": p.amount,
+                "ts": p.ts,
+                "event_id": str(uuid.uuid4()),
+                # pydantic-core serializes straight to JSON (no dict + json.dumps)
+                "payload": p.model_dump_json(),
+            },
         )
-        db.add(evt)
-
         db.commit()
         return PaymentOut(payment_id=p.payment_id, status="accepted")
 
@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from sqlalchemy import (
     String, DateTime, Numeric, Integer, Text,
-    Index, func
+    Index, func, text
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
@@ -34,4 +34,11 @@ class OutboxEvent(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     published_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
-Index("idx_outbox_poll", OutboxEvent.status, OutboxEvent.available_at, OutboxEvent.created_at)
+# Partial index: only pending rows, so it stays the size of the backlog no
+# matter how many published events accumulate.
+Index(
+    "idx_outbox_poll_pending",
+    OutboxEvent.available_at,
+    OutboxEvent.created_at,
+    postgresql_where=text("status = 'pending'"),
+)
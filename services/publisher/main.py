@@ -1,9 +1,12 @@
 import os
+import json
 import time
+import select
 from datetime import datetime, timedelta, timezone
 
 import boto3
-from sqlalchemy import create_engine, select, update, text
+from botocore.config import Config
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
 from models import Base, OutboxEvent 
@@ -23,19 +26,85 @@ def db_url() -> str:
 
 QUEUE_URL = _env("QUEUE_URL")
 REGION = _env("AWS_REGION")
+# published rows are only kept for auditing; purge them after this many days
+RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+PURGE_INTERVAL_SECONDS = 3600
+# the API's outbox trigger NOTIFYs this channel on every insert
+NOTIFY_CHANNEL = "outbox_new"
+MAX_IDLE_WAIT_SECONDS = 30.0
+# due rows can still be locked by another publisher; don't spin on them
+MIN_IDLE_WAIT_SECONDS = 0.1
 
 engine = create_engine(db_url(), pool_pre_ping=True, pool_size=3, max_overflow=5)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
-sqs = boto3.client("sqs", region_name=REGION)
+# keep-alive connections, adaptive retries and short timeouts so a slow SQS
+# call fails fast back into the outbox backoff instead of stalling the loop
+_boto_cfg = Config(
+    max_pool_connections=50,
+    retries={"mode": "adaptive", "max_attempts": 3},
+    tcp_keepalive=True,
+    connect_timeout=2,
+    read_timeout=5,
+)
+sqs = boto3.client("sqs", region_name=REGION, config=_boto_cfg)
+
+def open_listener():
+    # dedicated autocommit connection that stays LISTENing between polls
+    conn = engine.raw_connection()
+    pg = conn.driver_connection
+    pg.autocommit = True
+    with pg.cursor() as cur:
+        cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+    return conn
+
+def wait_for_events(listener, timeout: float):
+    pg = listener.driver_connection
+    if select.select([pg], [], [], timeout) != ([], [], []):
+        pg.poll()
+        pg.notifies.clear()
+
+def seconds_until_next_due(db) -> float:
+    # backed-off rows become due without an INSERT, so don't sleep past them
+    wait = db.execute(
+        text("""
+        SELECT EXTRACT(EPOCH FROM min(available_at) - now())
+        FROM outbox_events
+        WHERE status = 'pending'
+        """)
+    ).scalar()
+    if wait is None:
+        return MAX_IDLE_WAIT_SECONDS
+    return min(max(float(wait), MIN_IDLE_WAIT_SECONDS), MAX_IDLE_WAIT_SECONDS)
 
 def main():
     print("publisher started")
-    Base.metadata.create_all(bind=engine)
+    # schema is owned by the API's Alembic migrations; create_all is local dev only
+    if os.getenv("AUTO_CREATE_SCHEMA"):
+        Base.metadata.create_all(bind=engine)
 
+    last_purge = 0.0
+    listener = None
     while True:
         db = SessionLocal()
         try:
+            if listener is None:
+                listener = open_listener()
+
+            if time.monotonic() - last_purge > PURGE_INTERVAL_SECONDS:
+                purged = db.execute(
+                    text("""
+                    DELETE FROM outbox_events
+                    WHERE status = 'published'
+                      AND published_at < now() - make_interval(days => :days)
+                    """),
+                    {"days": RETENTION_DAYS},
+                ).rowcount
+                db.commit()
+                last_purge = time.monotonic()
+                if purged:
+                    print(f"purged {purged} published events")
+
             # Core：FOR UPDATE SKIP LOCKED，avoiding rows being processed by other workers
             rows = db.execute(
                 text("""
@@ -50,48 +119,67 @@ def main():
             ).fetchall()
 
             if not rows:
+                timeout = seconds_until_next_due(db)
                 db.commit()
-                time.sleep(1.0)
+                wait_for_events(listener, timeout)
                 continue
 
-            for (event_id, payload) in rows:
-                try:
-                    sqs.send_message(
-                        QueueUrl=QUEUE_URL,
-                        MessageBody=str(payload) if isinstance(payload, str) else __import__("json").dumps(payload),
-                        MessageAttributes={
-                            "producer": {"DataType": "String", "StringValue": "publisher"},
-                        },
-                    )
-                    print(f"sent event {event_id} to SQS")
-                    # mark published
-                    db.execute(
-                        text("""
-                        UPDATE outbox_events
-                        SET status='published',
-                            published_at=now()
-                        WHERE id=:id
-                        """),
-                        {"id": str(event_id)},
-                    )
-                except Exception as e:
-                    # fail：attempts++ + backoff + pending
-                    db.execute(
-                        text("""
-                        UPDATE outbox_events
-                        SET attempts = attempts + 1,
-                            available_at = now() + (:backoff || ' seconds')::interval
-                        WHERE id=:id
-                        """),
-                        {"id": str(event_id), "backoff": 5},
-                    )
-                    print(f"send failed for {event_id}: {e}")
+            # One SendMessageBatch (LIMIT 10 == SQS batch max) and at most two
+            # UPDATEs per poll instead of a send + UPDATE per row.
+            entries = [
+                {
+                    "Id": str(event_id),
+                    "MessageBody": payload if isinstance(payload, str) else json.dumps(payload),
+                    "MessageAttributes": {
+                        "producer": {"DataType": "String", "StringValue": "publisher"},
+                    },
+                }
+                for (event_id, payload) in rows
+            ]
+            try:
+                resp = sqs.send_message_batch(QueueUrl=QUEUE_URL, Entries=entries)
+                ok_ids = [ok["Id"] for ok in resp.get("Successful", [])]
+                fail_ids = []
+                for f in resp.get("Failed", []):
+                    fail_ids.append(f["Id"])
+                    print(f"send failed for {f['Id']}: {f.get('Code')} {f.get('Message')}")
+            except Exception as e:
+                ok_ids = []
+                fail_ids = [entry["Id"] for entry in entries]
+                print(f"send batch failed for {len(fail_ids)} events: {e}")
+
+            if ok_ids:
+                db.execute(
+                    text("""
+                    UPDATE outbox_events
+                    SET status='published',
+                        published_at=now()
+                    WHERE id = ANY(CAST(:ids AS uuid[]))
+                    """),
+                    {"ids": ok_ids},
+                )
+                print(f"sent {len(ok_ids)} events to SQS")
+            if fail_ids:
+                # fail：attempts++ + exponential backoff (5s, 10s, 20s ... capped at 5 min) + pending
+                db.execute(
+                    text("""
+                    UPDATE outbox_events
+                    SET attempts = attempts + 1,
+                        available_at = now() + make_interval(secs => LEAST(5 * power(2, attempts), 300))
+                    WHERE id = ANY(CAST(:ids AS uuid[]))
+                    """),
+                    {"ids": fail_ids},
+                )
 
             db.commit()
 
         except Exception as e:
             db.rollback()
             print(f"loop error: {e}")
+            if listener is not None:
+                # may be the listener that broke; reconnect on the next pass
+                listener.invalidate()
+                listener = None
             time.sleep(2.0)
         finally:
             db.close()
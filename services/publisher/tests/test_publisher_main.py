@@ -0,0 +1,52 @@
+import socket
+import time
+
+import main
+
+
+class FakePg:
+    """Stands in for the psycopg2 connection: select() waits on a socket."""
+
+    def __init__(self, sock):
+        self._sock = sock
+        self.notifies = []
+        self.polls = 0
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def poll(self):
+        self.polls += 1
+        self._sock.recv(1024)
+        self.notifies.append("outbox_new")
+
+
+class FakeListener:
+    def __init__(self, pg):
+        self.driver_connection = pg
+
+
+def test_wait_for_events_wakes_on_notify():
+    ours, theirs = socket.socketpair()
+    with ours, theirs:
+        pg = FakePg(ours)
+        theirs.send(b"x")
+
+        start = time.monotonic()
+        main.wait_for_events(FakeListener(pg), timeout=5.0)
+
+        assert time.monotonic() - start < 1.0
+        assert pg.polls == 1
+        assert pg.notifies == []
+
+
+def test_wait_for_events_times_out_when_idle():
+    ours, theirs = socket.socketpair()
+    with ours, theirs:
+        pg = FakePg(ours)
+
+        start = time.monotonic()
+        main.wait_for_events(FakeListener(pg), timeout=0.2)
+
+        assert time.monotonic() - start >= 0.2
+        assert pg.polls == 0
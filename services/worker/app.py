@@ -1,9 +1,32 @@
 import os
+import re
+import hashlib
+import sys
 import time
-import json
-from datetime import datetime, timezone
+import uuid
+import logging
+import queue
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import NamedTuple
+import io
 import boto3
-from botocore.exceptions import ClientError
+import orjson
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+# one line per record, written by the handler (thread-safe across pollers);
+# per-message lines are DEBUG so the default INFO level keeps them off the
+# hot path
+logging.basicConfig(
+    stream=sys.stdout,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="[worker] %(levelname)s %(threadName)s %(message)s",
+)
+logger = logging.getLogger("worker")
 
 REGION = os.getenv("AWS_REGION", "us-east-1")
 QUEUE_URL = os.environ["QUEUE_URL"]
@@ -11,26 +34,114 @@ BUCKET = os.environ["BUCKET"]
 
 RAW_PREFIX = os.getenv("PREFIX", "raw")              # raw
 QUAR_PREFIX = os.getenv("QUAR_PREFIX", "quarantine") # quarantine
+MAX_MESSAGES = max(1, min(int(os.getenv("SQS_MAX_MESSAGES", "10")), 10))  # messages per receive (SQS allows 1-10)
+WAIT_SECONDS = int(os.getenv("SQS_WAIT_SECONDS", "20"))   # long poll
+VISIBILITY_TIMEOUT = int(os.getenv("SQS_VISIBILITY_TIMEOUT", "300"))  # covers queue wait + batched delete
+# identical for every receive_message call; built once
+RECEIVE_KWARGS = {
+    "QueueUrl": QUEUE_URL,
+    "MaxNumberOfMessages": MAX_MESSAGES,
+    "WaitTimeSeconds": WAIT_SECONDS,
+    "VisibilityTimeout": VISIBILITY_TIMEOUT,
+    "MessageAttributeNames": ["producer"],  # the only attribute the worker reads
+}
+
+# Pipeline: POLLERS threads only receive and push messages onto a bounded
+# work queue; PUT_WORKERS threads parse + write them and hand receipts to a
+# delete batcher. A full queue blocks the pollers, so the task never holds
+# more messages than it can work through. Threads share the boto3 clients,
+# which are safe to use across threads.
+POLLERS = int(os.getenv("POLLERS", "4"))
+PUT_WORKERS = int(os.getenv("PUT_WORKERS", "16"))
+WORK_QUEUE_SIZE = int(os.getenv("WORK_QUEUE_SIZE", "32"))
+DELETE_FLUSH_SECONDS = 0.2
+
+# size each HTTP pool to the threads that can use the client at once so
+# keep-alive connections are reused instead of discarded ("Connection pool is
+# full") and re-handshaked
+_boto_cfg = Config(
+    max_pool_connections=PUT_WORKERS,
+    retries={"mode": "adaptive", "max_attempts": 10},
+    tcp_keepalive=True,
+)
+# SQS: every poller's receive, plus deletes issued from any PUT worker, the
+# delete flusher or the batch flusher
+_sqs_cfg = _boto_cfg.merge(Config(max_pool_connections=POLLERS + PUT_WORKERS + 2))
+sqs = boto3.client("sqs", region_name=REGION, config=_sqs_cfg)
+# The default resolver already targets the regional endpoint (and the zonal
+# one for directory buckets), so no endpoint_url is pinned. S3_ACCELERATE is
+# for a worker running far from a general-purpose bucket that has Transfer
+# Acceleration enabled; it needs internet egress, not the S3 gateway endpoint.
+S3_ACCELERATE = os.getenv("S3_ACCELERATE", "").lower() in ("1", "true", "yes")
+s3 = boto3.client(
+    "s3",
+    region_name=REGION,
+    config=_boto_cfg.merge(Config(s3={"use_accelerate_endpoint": True})) if S3_ACCELERATE else _boto_cfg,
+)
+
+# Micro-batching (opt-in): buffer raw events per dt partition and write each
+# buffer as one NDJSON object instead of one object per event
+RAW_BATCHING = os.getenv("RAW_BATCHING", "").lower() in ("1", "true", "yes")
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(4 * 1024 * 1024)))
+BATCH_MAX_SECONDS = float(os.getenv("BATCH_MAX_SECONDS", "5"))
+# batches above 16 MiB go up as parallel 16 MiB multipart parts; smaller
+# ones stay a single PutObject
+BATCH_TRANSFER = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=4,
+)
+
+class BatchClock(NamedTuple):
+    # taken once per received batch; per-message precision isn't needed for
+    # partitioning or ingest metadata
+    iso: str    # ingested_at / received_at, e.g. 2026-01-18T05:00:00.123Z
+    day: str    # ingest-date partition, YYYY-MM-DD
+    epoch: int  # quarantine key timestamp
+
+    @classmethod
+    def now(cls) -> "BatchClock":
+        now = datetime.now(timezone.utc)
+        return cls(
+            iso=now.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            day=now.strftime("%Y-%m-%d"),
+            epoch=int(now.timestamp()),
+        )
+
+_UTC_TS = re.compile(
+    r"(\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01]))T(?:[01]\d|2[0-3]):[0-5]\d(?::[0-5]\d(?:\.\d+)?)?Z"
+)
 
-sqs = boto3.client("sqs", region_name=REGION)
-s3 = boto3.client("s3", region_name=REGION)
+def _utc_day(ts: str) -> str | None:
+    # the regex bounds the time fields; the date still needs a calendar
+    # check (2026-02-31 matches the pattern but doesn't exist)
+    m = _UTC_TS.fullmatch(ts)
+    if m is None:
+        return None
+    try:
+        date.fromisoformat(m.group(1))
+    except ValueError:
+        return None
+    return m.group(1)
 
-def parse_dt(event: dict) -> str:
+def parse_dt(event: dict, ingest_day: str) -> str:
     """
     Prefer event time partition (UTC date). Fallback to ingest date.
     Expect event['ts'] like '2026-01-18T05:00:00Z' or ISO8601.
     """
     ts = event.get("ts")
     if isinstance(ts, str):
+        # common case: already UTC ('...Z'), so the date is the first 10 chars
+        day = _utc_day(ts)
+        if day:
+            return day
         try:
-            # handle trailing Z
-            if ts.endswith("Z"):
-                ts = ts[:-1] + "+00:00"
+            # other offsets: parse and convert (3.11 fromisoformat takes 'Z' too)
             dt = datetime.fromisoformat(ts).astimezone(timezone.utc)
             return dt.strftime("%Y-%m-%d")
         except Exception:
             pass
-    return time.strftime("%Y-%m-%d")
+    return ingest_day
 
 def get_producer(attrs: dict) -> str | None:
     prod = attrs.get("producer") if isinstance(attrs, dict) else None
@@ -38,91 +149,291 @@ def get_producer(attrs: dict) -> str | None:
         return prod.get("StringValue")
     return None
 
-def put_json(bucket: str, key: str, obj: dict) -> None:
-    s3.put_object(
-        Bucket=bucket,
-        Key=key,
-        Body=json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8"),
-        ContentType="application/json",
-    )
-
-def main():
-    print(f"[worker] starting region={REGION} queue={QUEUE_URL} bucket={BUCKET} raw={RAW_PREFIX} quar={QUAR_PREFIX}", flush=True)
+def put_json(bucket: str, key: str, obj: dict, *, create_only: bool = False) -> bool:
+    """
+    PUT obj as JSON. With create_only the write is conditional (If-None-Match: *)
+    and returns False when the key already exists instead of overwriting it.
+    """
+    kwargs = {"IfNoneMatch": "*"} if create_only else {}
+    try:
+        s3.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=orjson.dumps(obj),  # compact UTF-8 bytes
+            ContentType="application/json",
+            **kwargs,
+        )
+    except ClientError as e:
+        if create_only and e.response.get("Error", {}).get("Code") == "PreconditionFailed":
+            return False
+        raise
+    return True
 
-    while True:
-        resp = sqs.receive_message(
+def delete_batch(receipts: list[str]) -> None:
+    # one DeleteMessageBatch call; callers pass at most 10 receipts (the API max)
+    if not receipts:
+        return
+    try:
+        resp = sqs.delete_message_batch(
             QueueUrl=QUEUE_URL,
-            MaxNumberOfMessages=5,
-            WaitTimeSeconds=20,
-            VisibilityTimeout=60,
-            MessageAttributeNames=["All"],
+            Entries=[{"Id": str(i), "ReceiptHandle": rh} for i, rh in enumerate(receipts)],
         )
+    except (ClientError, BotoCoreError) as e:
+        # nothing deleted (API or network error, e.g. an endpoint timeout): the
+        # batch is redelivered after the visibility timeout
+        logger.error("AWS error deleting batch: %s", e)
+        return
+    # failed deletes are left alone: the message reappears and is retried / DLQ
+    for f in resp.get("Failed", []):
+        logger.warning("delete failed id=%s code=%s msg=%s", f["Id"], f.get("Code"), f.get("Message"))
+    logger.info("deleted %d messages", len(resp.get("Successful", [])))
+
+class DeleteBatcher:
+    """
+    Collects receipts from the PUT workers and deletes them with
+    DeleteMessageBatch as soon as 10 are pending, or every flush_seconds.
+    """
+
+    def __init__(self, flush_seconds: float):
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._pending: list[str] = []
+
+    def add(self, receipt: str) -> None:
+        with self._lock:
+            self._pending.append(receipt)
+            if len(self._pending) < 10:
+                return
+            batch, self._pending = self._pending, []
+        delete_batch(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, []
+        delete_batch(batch)
+
+    def run(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+DELETER = DeleteBatcher(DELETE_FLUSH_SECONDS)
+
+@dataclass
+class _RawBuffer:
+    started: float
+    size: int = 0
+    lines: list[bytes] = field(default_factory=list)
+    receipts: list[str] = field(default_factory=list)
+
+class RawBatcher:
+    """
+    Collects enriched events per dt partition. A buffer is written as one
+    NDJSON object once it reaches max_bytes or max_seconds, and its messages
+    are deleted only after that PUT succeeds.
+    """
+
+    def __init__(self, max_bytes: int, max_seconds: float):
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._buffers: dict[str, _RawBuffer] = {}
+
+    def add(self, dt: str, line: bytes, receipt: str) -> None:
+        with self._lock:
+            buf = self._buffers.get(dt)
+            if buf is None:
+                buf = self._buffers[dt] = _RawBuffer(started=time.monotonic())
+            buf.lines.append(line)
+            buf.receipts.append(receipt)
+            buf.size += len(line)
+            full = buf.size >= self.max_bytes
+            if full:
+                del self._buffers[dt]
+        if full:
+            self._write(dt, buf)
+
+    def flush_expired(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                (dt, buf) for dt, buf in self._buffers.items()
+                if now - buf.started >= self.max_seconds
+            ]
+            for dt, _ in expired:
+                del self._buffers[dt]
+        for dt, buf in expired:
+            self._write(dt, buf)
+
+    def _write(self, dt: str, buf: _RawBuffer) -> None:
+        key = f"{RAW_PREFIX}/payments/dt={dt}/batch-{int(time.time())}-{uuid.uuid4().hex}.ndjson"
+        try:
+            s3.upload_fileobj(
+                io.BytesIO(b"".join(buf.lines)),
+                BUCKET,
+                key,
+                ExtraArgs={"ContentType": "application/x-ndjson"},
+                Config=BATCH_TRANSFER,
+            )
+        except (ClientError, BotoCoreError, S3UploadFailedError) as e:
+            # not deleted: the messages reappear after the visibility timeout
+            logger.error("AWS error writing batch s3://%s/%s: %s", BUCKET, key, e)
+            return
+        logger.info("wrote %d events to s3://%s/%s", len(buf.lines), BUCKET, key)
+        for receipt in buf.receipts:
+            DELETER.add(receipt)
+
+BATCHER = RawBatcher(BATCH_MAX_BYTES, BATCH_MAX_SECONDS) if RAW_BATCHING else None
+
+def flush_loop():
+    # age-based flushes, since pollers may sit in a long poll
+    while True:
+        time.sleep(min(1.0, BATCH_MAX_SECONDS))
+        BATCHER.flush_expired()
+
+def process_message(m: dict, clock: BatchClock) -> str | None:
+    """
+    Write one message's event to S3 (or quarantine it).
+    Returns the receipt handle when the message can be deleted, None to
+    leave it for redelivery (or, with RAW_BATCHING, for the batcher to delete).
+    """
+    body = m.get("Body", "")
+    receipt = m["ReceiptHandle"]
+    attrs = m.get("MessageAttributes", {})
+    producer = get_producer(attrs)
+
+    try:
+        event = orjson.loads(body)  # JSONDecodeError is a ValueError -> quarantine
+        if not isinstance(event, dict):
+            raise ValueError("event is not an object")
+
+        payment_id = event.get("payment_id")
+        if not isinstance(payment_id, str) or not payment_id:
+            raise ValueError("missing/invalid payment_id")
+
+        dt = parse_dt(event, clock.day)
+
+        # add ingestion metadata (helps debugging); the parsed event is ours
+        # and discarded after the PUT, so annotate it in place
+        event["_meta"] = {"ingested_at": clock.iso, "producer": producer}
+
+        if BATCHER is not None:
+            # deleted by the batcher once its NDJSON object is written
+            BATCHER.add(dt, orjson.dumps(event) + b"\n", receipt)
+            return None
+
+        # idempotent-ish raw key: one file per payment_id per day. The hash
+        # shard spreads a day's writes over 256 prefixes so S3 can split
+        # them; it sits under dt= so the pipeline still reads one day prefix.
+        shard = hashlib.blake2b(payment_id.encode(), digest_size=1).hexdigest()
+        key = f"{RAW_PREFIX}/payments/dt={dt}/sh={shard}/payment_id={payment_id}.json"
+
+        # a redelivery (e.g. after a failed delete) finds the object already
+        # written; S3 rejects the duplicate and the message is just deleted
+        if put_json(BUCKET, key, event, create_only=True):
+            logger.debug("wrote s3://%s/%s producer=%s", BUCKET, key, producer)
+        else:
+            logger.info("already written s3://%s/%s; deleting duplicate", BUCKET, key)
+        return receipt
+
+    except ValueError as e:
+        # Bad data: quarantine + delete (no point retrying)
+        # MessageId keeps same-second quarantines (now concurrent) apart
+        qkey = f"{QUAR_PREFIX}/dt={clock.day}/{clock.epoch}-{m['MessageId']}.json"
+        try:
+            put_json(BUCKET, qkey, {
+                "error": str(e),
+                "body": body,
+                "attributes": attrs,
+                "received_at": clock.iso,
+            })
+            logger.warning("quarantined s3://%s/%s error=%s", BUCKET, qkey, e)
+        except Exception as qe:
+            # If even quarantine fails, do NOT delete message; let it retry / DLQ
+            logger.error("quarantine failed: %s; original_error=%s", qe, e)
+            return None
+
+        return receipt
+
+    except ClientError as e:
+        # AWS transient / permission / throttling - do not delete, allow retry / DLQ
+        logger.error("AWS error: %s; will retry; producer=%s", e, producer)
+        return None
+
+    except Exception as e:
+        # Unknown error - do not delete, allow retry / DLQ
+        logger.exception("error processing message: %s; will retry; producer=%s", e, producer)
+        return None
+
+WORK_QUEUE: queue.Queue = queue.Queue(maxsize=WORK_QUEUE_SIZE)
+
+def receive_backoff(misses: int) -> float:
+    # 0.1s, 0.2s, ... capped at 1s; the exponent is capped too, so a long run
+    # of misses can't overflow the float
+    return min(1.0, 0.1 * 2 ** min(misses, 4))
+
+def poll_loop():
+    # A normal empty long poll waited WAIT_SECONDS already and loops straight
+    # back. An empty response that came back early (or a receive error) backs
+    # off 0.1s, 0.2s, ... up to 1s so a misbehaving endpoint isn't hammered.
+    misses = 0
+    while True:
+        started = time.monotonic()
+        try:
+            resp = sqs.receive_message(**RECEIVE_KWARGS)
+        except (ClientError, BotoCoreError) as e:
+            # BotoCoreError covers connect/read timeouts to the SQS endpoint
+            logger.error("AWS error receiving: %s", e)
+            time.sleep(receive_backoff(misses))
+            misses += 1
+            continue
 
         msgs = resp.get("Messages", [])
         if not msgs:
+            if time.monotonic() - started < WAIT_SECONDS:
+                time.sleep(receive_backoff(misses))
+                misses += 1
+            else:
+                misses = 0
             continue
+        misses = 0
 
+        clock = BatchClock.now()
         for m in msgs:
-            body = m.get("Body", "")
-            receipt = m["ReceiptHandle"]
-            attrs = m.get("MessageAttributes", {})
-            producer = get_producer(attrs)
-
-            try:
-                event = json.loads(body)
-                if not isinstance(event, dict):
-                    raise ValueError("event is not an object")
-
-                payment_id = event.get("payment_id")
-                if not isinstance(payment_id, str) or not payment_id:
-                    raise ValueError("missing/invalid payment_id")
-
-                dt = parse_dt(event)
-
-                # add ingestion metadata (helps debugging)
-                enriched = dict(event)
-                enriched["_meta"] = {
-                    "ingested_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-                    "producer": producer,
-                }
-
-                # idempotent-ish raw key: one file per payment_id per day
-                key = f"{RAW_PREFIX}/payments/dt={dt}/payment_id={payment_id}.json"
-
-                put_json(BUCKET, key, enriched)
-                print(f"[worker] wrote s3://{BUCKET}/{key} producer={producer}", flush=True)
-
-                sqs.delete_message(QueueUrl=QUEUE_URL, ReceiptHandle=receipt)
-                print("[worker] deleted message", flush=True)
-
-            except ValueError as e:
-                # Bad data: quarantine + delete (no point retrying)
-                dt_ingest = time.strftime("%Y-%m-%d")
-                qkey = f"{QUAR_PREFIX}/dt={dt_ingest}/{int(time.time())}.json"
-                try:
-                    put_json(BUCKET, qkey, {
-                        "error": str(e),
-                        "body": body,
-                        "attributes": attrs,
-                        "received_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-                    })
-                    print(f"[worker] quarantined s3://{BUCKET}/{qkey} error={e}", flush=True)
-                except Exception as qe:
-                    # If even quarantine fails, do NOT delete message; let it retry / DLQ
-                    print(f"[worker] ERROR quarantine failed: {qe}; original_error={e}", flush=True)
-                    continue
-
-                sqs.delete_message(QueueUrl=QUEUE_URL, ReceiptHandle=receipt)
-
-            except ClientError as e:
-                # AWS transient / permission / throttling - do not delete, allow retry / DLQ
-                print(f"[worker] AWS ERROR: {e}; will retry; producer={producer}", flush=True)
-                continue
-
-            except Exception as e:
-                # Unknown error - do not delete, allow retry / DLQ
-                print(f"[worker] ERROR processing message: {e}; will retry; producer={producer}", flush=True)
-                continue
+            WORK_QUEUE.put((m, clock))  # blocks while the PUT workers are behind
+
+def put_loop():
+    while True:
+        m, clock = WORK_QUEUE.get()
+        receipt = process_message(m, clock)
+        if receipt:
+            DELETER.add(receipt)
+
+def main():
+    logger.info(
+        "starting region=%s queue=%s bucket=%s raw=%s quar=%s pollers=%d put_workers=%d",
+        REGION, QUEUE_URL, BUCKET, RAW_PREFIX, QUAR_PREFIX, POLLERS, PUT_WORKERS,
+    )
+
+    threads = [
+        threading.Thread(target=poll_loop, name=f"poller-{i}", daemon=True)
+        for i in range(POLLERS)
+    ] + [
+        threading.Thread(target=put_loop, name=f"put-{i}", daemon=True)
+        for i in range(PUT_WORKERS)
+    ]
+    threads.append(threading.Thread(target=DELETER.run, name="delete-flusher", daemon=True))
+    if BATCHER is not None:
+        threads.append(threading.Thread(target=flush_loop, name="batch-flusher", daemon=True))
+    for t in threads:
+        t.start()
+
+    # these loops only stop on an unexpected error; exit so ECS replaces the
+    # task instead of running on with part of the pipeline missing
+    while all(t.is_alive() for t in threads):
+        time.sleep(5.0)
+    logger.error("a worker thread died; exiting")
+    raise SystemExit(1)
 
 if __name__ == "__main__":
     main()
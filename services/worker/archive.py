@@ -0,0 +1,75 @@
+import os
+import sys
+import logging
+from datetime import datetime, timedelta, timezone
+
+import boto3
+
+# Nightly copy of raw/ from the S3 Express directory bucket (where the worker
+# writes when raw_to_hot_bucket is on) to the SSE-KMS data bucket. Runs as a
+# scheduled ECS task using the worker image.
+
+logging.basicConfig(
+    stream=sys.stdout,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="[archive] %(levelname)s %(message)s",
+)
+logger = logging.getLogger("archive")
+
+REGION = os.getenv("AWS_REGION", "us-east-1")
+SRC_BUCKET = os.environ["SRC_BUCKET"]
+DEST_BUCKET = os.environ["DEST_BUCKET"]
+PAYMENTS_PREFIX = os.getenv("PREFIX", "raw") + "/payments/"
+# dt= partitions (today and the days before it) compared on each run; every
+# partition gets ARCHIVE_DAYS nightly chances. 0 compares all of them (backfill).
+ARCHIVE_DAYS = int(os.getenv("ARCHIVE_DAYS", "3"))
+
+s3 = boto3.client("s3", region_name=REGION)
+
+def list_keys(bucket: str, prefix: str):
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            yield obj["Key"]
+
+def day_prefixes() -> list[str]:
+    if ARCHIVE_DAYS > 0:
+        today = datetime.now(timezone.utc).date()
+        return [
+            f"{PAYMENTS_PREFIX}dt={today - timedelta(days=n)}/"
+            for n in range(ARCHIVE_DAYS)
+        ]
+    prefixes = []
+    pages = s3.get_paginator("list_objects_v2").paginate(
+        Bucket=SRC_BUCKET, Prefix=PAYMENTS_PREFIX, Delimiter="/"
+    )
+    for page in pages:
+        prefixes.extend(p["Prefix"] for p in page.get("CommonPrefixes", []))
+    return prefixes
+
+def archive_day(prefix: str) -> int:
+    # one partition at a time, so memory and LIST calls scale with a day's
+    # objects rather than with all of history
+    pending = set(list_keys(SRC_BUCKET, prefix))
+    if not pending:
+        return 0
+    pending.difference_update(list_keys(DEST_BUCKET, prefix))
+    for key in pending:
+        # destination default encryption (SSE-KMS + bucket key) applies
+        s3.copy_object(Bucket=DEST_BUCKET, Key=key, CopySource={"Bucket": SRC_BUCKET, "Key": key})
+    return len(pending)
+
+def main():
+    logger.info("s3://%s/%s -> s3://%s/%s days=%s", SRC_BUCKET, PAYMENTS_PREFIX,
+                DEST_BUCKET, PAYMENTS_PREFIX, ARCHIVE_DAYS or "all")
+
+    copied = 0
+    for prefix in day_prefixes():
+        n = archive_day(prefix)
+        if n:
+            logger.info("copied %d objects from %s", n, prefix)
+        copied += n
+
+    logger.info("copied %d objects", copied)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import os
+import sys
+
+# app.py and archive.py read their settings and build boto3 clients at import
+# time; the clients don't connect until used, and the tests swap them for fakes
+os.environ.setdefault("QUEUE_URL", "https://sqs.us-east-1.amazonaws.com/123456789012/test")
+os.environ.setdefault("BUCKET", "test-bucket")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("SRC_BUCKET", "hot--use1-az4--x-s3")
+os.environ.setdefault("DEST_BUCKET", "test-bucket")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,68 @@
+import archive
+
+
+class FakePaginator:
+    def __init__(self, s3):
+        self.s3 = s3
+
+    def paginate(self, *, Bucket, Prefix, Delimiter=None):
+        self.s3.listed.append((Bucket, Prefix))
+        keys = sorted(k for k in self.s3.objects.get(Bucket, {}) if k.startswith(Prefix))
+        if Delimiter is None:
+            yield {"Contents": [{"Key": k} for k in keys]}
+        else:
+            prefixes = sorted({Prefix + k[len(Prefix):].split(Delimiter)[0] + Delimiter for k in keys})
+            yield {"CommonPrefixes": [{"Prefix": p} for p in prefixes]}
+
+
+class FakeS3:
+    def __init__(self, objects):
+        self.objects = objects
+        self.listed = []
+        self.copied = []
+
+    def get_paginator(self, name):
+        assert name == "list_objects_v2"
+        return FakePaginator(self)
+
+    def copy_object(self, *, Bucket, Key, CopySource):
+        self.copied.append(Key)
+        self.objects.setdefault(Bucket, {})[Key] = self.objects[CopySource["Bucket"]][CopySource["Key"]]
+
+
+def test_archive_day_copies_only_missing_keys_of_that_day(monkeypatch):
+    src, dest = archive.SRC_BUCKET, archive.DEST_BUCKET
+    fake = FakeS3({
+        src: {
+            "raw/payments/dt=2026-01-18/sh=0a/payment_id=a.json": b"a",
+            "raw/payments/dt=2026-01-18/sh=0b/payment_id=b.json": b"b",
+            "raw/payments/dt=2026-01-17/sh=0c/payment_id=c.json": b"c",
+        },
+        dest: {
+            "raw/payments/dt=2026-01-18/sh=0a/payment_id=a.json": b"a",
+        },
+    })
+    monkeypatch.setattr(archive, "s3", fake)
+
+    assert archive.archive_day("raw/payments/dt=2026-01-18/") == 1
+    assert fake.copied == ["raw/payments/dt=2026-01-18/sh=0b/payment_id=b.json"]
+    assert fake.listed == [(src, "raw/payments/dt=2026-01-18/"), (dest, "raw/payments/dt=2026-01-18/")]
+
+
+def test_day_prefixes_all_partitions_when_window_is_zero(monkeypatch):
+    fake = FakeS3({
+        archive.SRC_BUCKET: {
+            "raw/payments/dt=2026-01-17/x.json": b"",
+            "raw/payments/dt=2026-01-18/y.json": b"",
+        },
+    })
+    monkeypatch.setattr(archive, "s3", fake)
+    monkeypatch.setattr(archive, "ARCHIVE_DAYS", 0)
+    assert archive.day_prefixes() == ["raw/payments/dt=2026-01-17/", "raw/payments/dt=2026-01-18/"]
+
+
+def test_day_prefixes_covers_the_recent_window(monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DAYS", 2)
+    today, yesterday = archive.day_prefixes()
+    assert today > yesterday
+    assert today.startswith("raw/payments/dt=")
@@ -0,0 +1,264 @@
+import threading
+import time
+
+import orjson
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+import app
+
+CLOCK = app.BatchClock(iso="2026-01-18T05:00:00.000Z", day="2026-01-18", epoch=1768712400)
+
+
+def client_error(code: str, status: int) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": code, "Message": code}, "ResponseMetadata": {"HTTPStatusCode": status}},
+        "PutObject",
+    )
+
+
+class FakeS3:
+    def __init__(self, log, error=None):
+        self.log = log
+        self.error = error
+        self.objects = {}
+
+    def put_object(self, *, Bucket, Key, Body, ContentType, **kwargs):
+        self.log.append(("put", Key))
+        if self.error is not None:
+            raise self.error
+        if kwargs.get("IfNoneMatch") == "*" and Key in self.objects:
+            raise client_error("PreconditionFailed", 412)
+        self.objects[Key] = Body
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        self.log.append(("put", key))
+        if self.error is not None:
+            raise self.error
+        self.objects[key] = fileobj.read()
+
+
+class FakeSQS:
+    def __init__(self, log, error=None):
+        self.log = log
+        self.error = error
+        self.batches = []
+
+    def delete_message_batch(self, *, QueueUrl, Entries):
+        receipts = [e["ReceiptHandle"] for e in Entries]
+        self.log.append(("delete", receipts))
+        if self.error is not None:
+            raise self.error
+        self.batches.append(receipts)
+        return {"Successful": [{"Id": e["Id"]} for e in Entries]}
+
+
+@pytest.fixture
+def log():
+    return []
+
+
+@pytest.fixture
+def s3(monkeypatch, log):
+    fake = FakeS3(log)
+    monkeypatch.setattr(app, "s3", fake)
+    return fake
+
+
+@pytest.fixture
+def sqs(monkeypatch, log):
+    fake = FakeSQS(log)
+    monkeypatch.setattr(app, "sqs", fake)
+    return fake
+
+
+@pytest.fixture
+def deleter(monkeypatch, sqs):
+    # flushed explicitly by the tests; run() is only started where timing matters
+    d = app.DeleteBatcher(flush_seconds=0.05)
+    monkeypatch.setattr(app, "DELETER", d)
+    return d
+
+
+def message(payment_id="p-1", receipt="r-1", **event):
+    return {
+        "MessageId": f"m-{receipt}",
+        "ReceiptHandle": receipt,
+        "Body": orjson.dumps({"payment_id": payment_id, **event}).decode(),
+        "MessageAttributes": {"producer": {"DataType": "String", "StringValue": "api"}},
+    }
+
+
+def test_sqs_pool_covers_every_thread_that_calls_sqs():
+    cfg = app._sqs_cfg
+    assert cfg.max_pool_connections >= app.POLLERS + app.PUT_WORKERS + 1
+    assert cfg.retries == app._boto_cfg.retries
+
+
+def test_receive_backoff_caps_without_overflow():
+    assert [app.receive_backoff(n) for n in range(5)] == [0.1, 0.2, 0.4, 0.8, 1.0]
+    assert app.receive_backoff(10_000) == 1.0
+
+
+# -----------------------------
+# parse_dt
+# -----------------------------
+
+@pytest.mark.parametrize(
+    "ts, expected",
+    [
+        ("2026-01-18T05:00:00Z", "2026-01-18"),
+        ("2026-01-18T05:00:00.123456Z", "2026-01-18"),
+        ("2026-01-18T05:00Z", "2026-01-18"),
+        # offsets are converted to UTC, which can change the date
+        ("2026-01-18T23:30:00-05:00", "2026-01-19"),
+        ("2026-01-18T01:00:00+09:00", "2026-01-17"),
+        ("2026-01-18T05:00:00+00:00", "2026-01-18"),
+    ],
+)
+def test_parse_dt_uses_event_time_in_utc(ts, expected):
+    assert app.parse_dt({"ts": ts}, "2000-01-01") == expected
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        {},
+        {"ts": None},
+        {"ts": 1768712400},
+        {"ts": "yesterday"},
+        {"ts": "2026-13-01T00:00:00Z"},
+        {"ts": "2026-02-31T05:00:00Z"},
+        {"ts": "2026-01-18T25:00:00Z"},
+        {"ts": "2026-01-18T05:60:00Z"},
+    ],
+)
+def test_parse_dt_falls_back_to_ingest_day(event):
+    assert app.parse_dt(event, "2000-01-01") == "2000-01-01"
+
+
+# -----------------------------
+# put_json / process_message (one object per event)
+# -----------------------------
+
+def test_put_json_conditional_put_reports_existing_key(s3):
+    assert app.put_json("b", "k", {"a": 1}, create_only=True) is True
+    assert app.put_json("b", "k", {"a": 2}, create_only=True) is False
+    assert orjson.loads(s3.objects["k"]) == {"a": 1}
+
+
+def test_put_json_other_errors_propagate(s3):
+    s3.error = client_error("SlowDown", 503)
+    with pytest.raises(ClientError):
+        app.put_json("b", "k", {}, create_only=True)
+
+
+def test_redelivered_message_is_acknowledged_without_overwrite(s3):
+    assert app.process_message(message(receipt="r-1"), CLOCK) == "r-1"
+    assert app.process_message(message(receipt="r-2"), CLOCK) == "r-2"
+    assert len(s3.objects) == 1
+
+
+def test_failed_put_keeps_the_message(s3):
+    s3.error = client_error("InternalError", 500)
+    assert app.process_message(message(), CLOCK) is None
+
+
+def test_invalid_event_is_quarantined_and_acknowledged(s3):
+    m = message()
+    m["Body"] = "not json"
+    assert app.process_message(m, CLOCK) == "r-1"
+    [key] = s3.objects
+    assert key.startswith("quarantine/dt=2026-01-18/")
+
+
+# -----------------------------
+# DeleteBatcher
+# -----------------------------
+
+def test_delete_batcher_flushes_at_ten_receipts(deleter, sqs):
+    for i in range(9):
+        deleter.add(f"r-{i}")
+    assert sqs.batches == []
+    deleter.add("r-9")
+    assert sqs.batches == [[f"r-{i}" for i in range(10)]]
+
+
+def test_delete_batcher_flushes_on_time(deleter, sqs):
+    deleter.add("r-1")
+    threading.Thread(target=deleter.run, daemon=True).start()
+    deadline = time.monotonic() + 2.0
+    while not sqs.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sqs.batches == [["r-1"]]
+
+
+def test_delete_batcher_skips_empty_flush(deleter, sqs):
+    deleter.flush()
+    assert sqs.batches == []
+
+
+def test_delete_batch_survives_network_errors(sqs):
+    sqs.error = EndpointConnectionError(endpoint_url="https://sqs.us-east-1.amazonaws.com")
+    app.delete_batch(["r-1"])  # logged; the receipt is redelivered
+    assert sqs.batches == []
+
+
+# -----------------------------
+# RawBatcher
+# -----------------------------
+
+def test_raw_batcher_flushes_on_size(s3, deleter, sqs, log):
+    batcher = app.RawBatcher(max_bytes=10, max_seconds=60)
+    batcher.add("2026-01-18", b"12345\n", "r-1")
+    assert s3.objects == {}
+    batcher.add("2026-01-18", b"67890\n", "r-2")
+    [body] = s3.objects.values()
+    assert body == b"12345\n67890\n"
+    deleter.flush()
+    assert sqs.batches == [["r-1", "r-2"]]
+    # the object was written before any of its receipts were deleted
+    assert [kind for kind, _ in log] == ["put", "delete"]
+
+
+def test_raw_batcher_flushes_on_age(s3, deleter, sqs):
+    batcher = app.RawBatcher(max_bytes=1 << 20, max_seconds=0.05)
+    batcher.add("2026-01-18", b"a\n", "r-1")
+    batcher.add("2026-01-19", b"b\n", "r-2")
+    batcher.flush_expired()
+    assert s3.objects == {}
+    time.sleep(0.06)
+    batcher.flush_expired()
+    assert len(s3.objects) == 2
+    deleter.flush()
+    assert sorted(sqs.batches[0]) == ["r-1", "r-2"]
+
+
+def test_raw_batcher_keeps_receipts_when_upload_fails(s3, deleter, sqs):
+    s3.error = client_error("InternalError", 500)
+    batcher = app.RawBatcher(max_bytes=1, max_seconds=60)
+    batcher.add("2026-01-18", b"a\n", "r-1")
+    deleter.flush()
+    assert sqs.batches == []
+
+
+def test_raw_batcher_keeps_receipts_on_network_errors(s3, deleter, sqs):
+    s3.error = EndpointConnectionError(endpoint_url="https://test-bucket.s3.amazonaws.com")
+    batcher = app.RawBatcher(max_bytes=1, max_seconds=60)
+    batcher.add("2026-01-18", b"a\n", "r-1")
+    deleter.flush()
+    assert sqs.batches == []
+
+
+def test_batched_message_is_deleted_only_by_the_batcher(monkeypatch, s3, deleter, sqs, log):
+    batcher = app.RawBatcher(max_bytes=1 << 20, max_seconds=60)
+    monkeypatch.setattr(app, "BATCHER", batcher)
+    assert app.process_message(message(receipt="r-1"), CLOCK) is None
+    deleter.flush()
+    assert log == []
+    batcher.flush_expired()  # not expired yet
+    batcher.max_seconds = 0
+    batcher.flush_expired()
+    deleter.flush()
+    assert [kind for kind, _ in log] == ["put", "delete"]
+    assert sqs.batches == [["r-1"]]